@@ -1,4 +1,5 @@
 import os
+import re
 import sys
 from logging.config import fileConfig
 
@@ -34,6 +35,18 @@ register_models()
 # Point Alembic at your metadata
 target_metadata = Base.metadata
 
+# Hash partitions (recipes_p0, favorites_p3, ...) are created by migrations and
+# not declared as models; keep autogenerate from proposing to drop them.
+PARTITION_TABLE_NAME = re.compile(r"^(recipes|favorites|recipe_notes)_p\d+$")
+
+def include_name(name, type_, parent_names):
+    return not (type_ == "table" and PARTITION_TABLE_NAME.match(name))
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Postgres backs a foreign key to a partitioned table with one internal
+    # constraint per partition; only the one on the parent is declared.
+    return not (type_ == "foreign_key_constraint" and PARTITION_TABLE_NAME.match(object.referred_table.name))
+
 # (Optional) Debug print of registered tables
 print(f"Registered tables for migration: {list(target_metadata.tables.keys())}")
 
@@ -43,6 +56,8 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -63,6 +78,8 @@ def run_migrations_online() -> None:
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            include_name=include_name,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,206 @@
+"""swap in partitioned tables
+
+Second step of partitioning recipes, favorites and recipe_notes (see
+c4ff7bfd1536). Writes to the three tables are blocked while this runs:
+rows `python -m app.jobs.partition_copy` has not copied yet are copied
+here, the mirror triggers are dropped and the partitioned tables take the
+live names. It refuses to run while the copy tool is more than
+MAX_UNCOPIED_IDS ids behind a table, since the rest would be copied under
+the lock; pass `-x allow_copy_under_lock=true` to copy it anyway when
+blocking writes for that long is acceptable. Validating the new recipe
+foreign keys of favorites and recipe_notes reads both tables once; that is
+most of the remaining lock time.
+
+Tables that referenced recipes(id) and have no owner column lose their
+foreign key; crud_recipe.delete_recipes deletes their rows instead.
+
+Revision ID: 9b0b3afeff6f
+Revises: c4ff7bfd1536
+Create Date: 2026-10-19 18:54:09.574413
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+from alembic.util import CommandError
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b0b3afeff6f'
+down_revision: Union[str, None] = 'c4ff7bfd1536'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PARTITIONS = 16
+
+# How far (in ids) partition_copy may lag a table before the swap refuses
+MAX_UNCOPIED_IDS = 50_000
+
+SHADOW_INDEXES = {
+    'recipes': ['ix_recipes_title', 'ix_recipes_owner_id_updated_at', 'ix_recipes_owner_id_cuisine'],
+    'favorites': ['ix_favorites_user_id_recipe_id', 'ix_favorites_recipe_id_user_id',
+                  'ix_favorites_created_at', 'ix_favorites_user_id_updated_at'],
+    'recipe_notes': ['ix_recipe_notes_user_id_updated_at', 'ix_recipe_notes_recipe_id_created_at_id'],
+}
+OWNER_FKS = {'recipes': 'owner_id', 'favorites': 'user_id', 'recipe_notes': 'user_id'}
+
+# Rows of each live table as the partitioned table stores them
+COPIED_ROWS = {
+    'recipes': 'SELECT source.* FROM recipes source',
+    'favorites': 'SELECT source.*, recipes.owner_id FROM favorites source '
+                 'JOIN recipes ON recipes.id = source.recipe_id',
+    'recipe_notes': 'SELECT source.*, recipes.owner_id FROM recipe_notes source '
+                    'JOIN recipes ON recipes.id = source.recipe_id',
+}
+
+# Column lists of the unpartitioned tables, for the downgrade
+PLAIN_COLUMNS = {
+    'recipes': 'id, title, cuisine, ingredients, tags, steps, owner_id, updated_at',
+    'favorites': 'id, recipe_id, user_id, created_at, updated_at',
+    'recipe_notes': 'id, text, created_at, recipe_id, user_id, updated_at',
+}
+MIRRORED_ROW = {
+    'recipes': 'SELECT (NEW).*',
+    'favorites': 'SELECT (NEW).*, owner_id FROM recipes WHERE id = NEW.recipe_id',
+    'recipe_notes': 'SELECT (NEW).*, owner_id FROM recipes WHERE id = NEW.recipe_id',
+}
+
+# Foreign keys to recipes(id) from tables that stay unpartitioned
+DROPPED_FKS = [
+    ('recipe_ingredient', 'recipe_id'),
+    ('recipe_neighbors', 'recipe_id'),
+    ('recipe_neighbors', 'neighbor_id'),
+    ('trending_recipes', 'recipe_id'),
+    ('recipe_cards', 'recipe_id'),
+    ('stale_recipe_cards', 'recipe_id'),
+]
+
+
+def _rename(table: str, old: str, new: str):
+    """Rename a partitioned table, its partitions, keys and indexes from `old*` to `new*`."""
+    op.execute(f'ALTER TABLE {old} RENAME TO {new}')
+    for remainder in range(PARTITIONS):
+        op.execute(f'ALTER TABLE {old}_p{remainder} RENAME TO {new}_p{remainder}')
+    op.execute(f'ALTER TABLE {new} RENAME CONSTRAINT {old}_pkey TO {new}_pkey')
+    column = OWNER_FKS[table]
+    op.execute(f'ALTER TABLE {new} RENAME CONSTRAINT {old}_{column}_fkey TO {new}_{column}_fkey')
+    suffix_old, suffix_new = old[len(table):], new[len(table):]
+    for index in SHADOW_INDEXES[table]:
+        op.execute(f'ALTER INDEX {index}{suffix_old} RENAME TO {index}{suffix_new}')
+
+
+def _check_copy_progress():
+    """Refuse to copy more than MAX_UNCOPIED_IDS ids of any table under the lock."""
+    if context.is_offline_mode() or context.get_x_argument(as_dictionary=True).get('allow_copy_under_lock') == 'true':
+        return
+    for table in COPIED_ROWS:
+        behind = op.get_bind().scalar(sa.text(f"""
+            SELECT coalesce(max(id), 0) - coalesce(
+                (SELECT last_id FROM partition_copy_progress WHERE table_name = :table), 0
+            ) FROM {table}
+        """), {'table': table})
+        if behind > MAX_UNCOPIED_IDS:
+            raise CommandError(
+                f'{table} has {behind} ids not copied into {table}_partitioned yet. Run '
+                f'python -m app.jobs.partition_copy first, or pass -x allow_copy_under_lock=true '
+                f'to copy them while writes are blocked.'
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _check_copy_progress()
+    op.execute('LOCK TABLE recipes, favorites, recipe_notes IN SHARE ROW EXCLUSIVE MODE')
+    for table, rows in COPIED_ROWS.items():
+        op.execute(f"""
+            INSERT INTO {table}_partitioned {rows}
+            WHERE source.id > coalesce(
+                (SELECT last_id FROM partition_copy_progress WHERE table_name = '{table}'), 0
+            )
+            ON CONFLICT DO NOTHING
+        """)
+        op.execute(f'DROP TRIGGER {table}_partitioned_mirror ON {table}')
+        op.execute(f'DROP FUNCTION {table}_partitioned_mirror()')
+    op.drop_table('partition_copy_progress')
+
+    for table, column in DROPPED_FKS:
+        op.drop_constraint(f'{table}_{column}_fkey', table, type_='foreignkey')
+    for table in COPIED_ROWS:
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}_partitioned.id')
+    op.execute('DROP TABLE recipe_notes, favorites, recipes')
+    for table in COPIED_ROWS:
+        _rename(table, f'{table}_partitioned', table)
+
+    # Foreign keys on partitioned tables cannot be added NOT VALID
+    for table in ('favorites', 'recipe_notes'):
+        op.create_foreign_key(f'{table}_recipe_id_recipe_owner_id_fkey', table, 'recipes',
+                              ['recipe_id', 'recipe_owner_id'], ['id', 'owner_id'], ondelete='CASCADE')
+    op.create_foreign_key('recipe_cards_recipe_id_owner_id_fkey', 'recipe_cards', 'recipes',
+                          ['recipe_id', 'owner_id'], ['id', 'owner_id'], ondelete='CASCADE', postgresql_not_valid=True)
+    # Only after the swap has committed and released its locks
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE recipe_cards VALIDATE CONSTRAINT recipe_cards_recipe_id_owner_id_fkey')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Back to unpartitioned tables by copying, with writes blocked throughout.
+    op.execute('LOCK TABLE recipes, favorites, recipe_notes IN SHARE ROW EXCLUSIVE MODE')
+    op.drop_constraint('recipe_cards_recipe_id_owner_id_fkey', 'recipe_cards', type_='foreignkey')
+    for table in ('favorites', 'recipe_notes'):
+        op.drop_constraint(f'{table}_recipe_id_recipe_owner_id_fkey', table, type_='foreignkey')
+    for table in COPIED_ROWS:
+        _rename(table, table, f'{table}_partitioned')
+
+    for table, columns in PLAIN_COLUMNS.items():
+        op.execute(f'CREATE TABLE {table} (LIKE {table}_partitioned INCLUDING DEFAULTS)')
+        if table != 'recipes':
+            op.execute(f'ALTER TABLE {table} DROP COLUMN recipe_owner_id')
+        op.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_partitioned')
+    for table, column in OWNER_FKS.items():
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        op.create_primary_key(f'{table}_pkey', table, ['id'])
+        op.create_index(f'ix_{table}_id', table, ['id'])
+        op.create_foreign_key(f'{table}_{column}_fkey', table, 'users', [column], ['id'])
+    op.create_index('ix_recipes_title', 'recipes', ['title'])
+    op.create_index('ix_recipes_owner_id_updated_at', 'recipes', ['owner_id', 'updated_at'])
+    op.create_index('ix_recipes_owner_id_cuisine', 'recipes', ['owner_id', 'cuisine'])
+    op.create_index('ix_favorites_user_id_recipe_id', 'favorites', ['user_id', 'recipe_id'])
+    op.create_index('ix_favorites_recipe_id_user_id', 'favorites', ['recipe_id', 'user_id'])
+    op.create_index('ix_favorites_created_at', 'favorites', ['created_at'])
+    op.create_index('ix_favorites_user_id_updated_at', 'favorites', ['user_id', 'updated_at'])
+    op.create_index('ix_recipe_notes_user_id_updated_at', 'recipe_notes', ['user_id', 'updated_at'])
+    op.create_index('ix_recipe_notes_recipe_id_created_at_id', 'recipe_notes', ['recipe_id', 'created_at', 'id'])
+    for table in ('favorites', 'recipe_notes'):
+        op.create_foreign_key(f'{table}_recipe_id_fkey', table, 'recipes', ['recipe_id'], ['id'], ondelete='CASCADE')
+    for table, column in DROPPED_FKS:
+        op.create_foreign_key(f'{table}_{column}_fkey', table, 'recipes', [column], ['id'], ondelete='CASCADE')
+
+    # The partitioned tables, now copies again, are dropped by c4ff7bfd1536's
+    # downgrade; empty them and reinstall what it expects.
+    op.create_table('partition_copy_progress',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    for table in COPIED_ROWS:
+        op.execute(f'TRUNCATE {table}_partitioned')
+        op.execute(f"""
+            CREATE FUNCTION {table}_partitioned_mirror() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM {table}_partitioned WHERE id = OLD.id;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {table}_partitioned {MIRRORED_ROW[table]};
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        op.execute(
+            f'CREATE TRIGGER {table}_partitioned_mirror AFTER INSERT OR UPDATE OR DELETE ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION {table}_partitioned_mirror()'
+        )
@@ -0,0 +1,118 @@
+"""partitioned shadow tables
+
+First step of moving recipes, favorites and recipe_notes to hash-partitioned
+tables without taking the app down. This creates the partitioned copies
+(`<table>_partitioned`) next to the live tables, plus triggers that mirror
+every write into them. Existing rows are copied in batches by
+`python -m app.jobs.partition_copy` while the app keeps running; the next
+revision then swaps the tables under a short lock.
+
+Revision ID: c4ff7bfd1536
+Revises: ac0c5c586ab4
+Create Date: 2026-10-19 18:53:06.066637
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4ff7bfd1536'
+down_revision: Union[str, None] = 'ac0c5c586ab4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PARTITIONS = 16  # app.models.recipe.PARTITION_COUNT when this was written
+
+# table -> (partition key, added columns, secondary indexes). favorites and
+# recipe_notes gain the recipe owner so they partition like their recipe.
+TABLES = {
+    'recipes': ('owner_id', '', {
+        'ix_recipes_title': 'title',
+        'ix_recipes_owner_id_updated_at': 'owner_id, updated_at',
+        'ix_recipes_owner_id_cuisine': 'owner_id, cuisine',
+    }),
+    'favorites': ('recipe_owner_id', 'recipe_owner_id integer NOT NULL,', {
+        'ix_favorites_user_id_recipe_id': 'user_id, recipe_id',
+        'ix_favorites_recipe_id_user_id': 'recipe_id, user_id',
+        'ix_favorites_created_at': 'created_at',
+        'ix_favorites_user_id_updated_at': 'user_id, updated_at',
+    }),
+    'recipe_notes': ('recipe_owner_id', 'recipe_owner_id integer NOT NULL,', {
+        'ix_recipe_notes_user_id_updated_at': 'user_id, updated_at',
+        'ix_recipe_notes_recipe_id_created_at_id': 'recipe_id, created_at, id',
+    }),
+}
+
+# Row images for the copies; favorites and notes look up their recipe's owner
+MIRRORED_ROW = {
+    'recipes': 'SELECT (NEW).*',
+    'favorites': 'SELECT (NEW).*, owner_id FROM recipes WHERE id = NEW.recipe_id',
+    'recipe_notes': 'SELECT (NEW).*, owner_id FROM recipes WHERE id = NEW.recipe_id',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, (key, added, indexes) in TABLES.items():
+        shadow = f'{table}_partitioned'
+        owner_fk = 'owner_id' if table == 'recipes' else 'user_id'
+        # LIKE ... INCLUDING DEFAULTS keeps the id sequence shared with the live table
+        op.execute(f"""
+            CREATE TABLE {shadow} (
+                LIKE {table} INCLUDING DEFAULTS,
+                {added}
+                PRIMARY KEY (id, {key}),
+                FOREIGN KEY ({owner_fk}) REFERENCES users (id)
+            ) PARTITION BY HASH ({key})
+        """)
+        for remainder in range(PARTITIONS):
+            op.execute(
+                f'CREATE TABLE {shadow}_p{remainder} PARTITION OF {shadow} '
+                f'FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})'
+            )
+        # Renamed to the live names when the tables are swapped
+        for name, columns in indexes.items():
+            op.execute(f'CREATE INDEX {name}_partitioned ON {shadow} ({columns})')
+
+        # An update is mirrored as delete + insert, which also covers a row
+        # moving to another partition. Rows not copied yet are simply not
+        # found by the delete; the batch copy never overwrites what a
+        # trigger wrote (ON CONFLICT DO NOTHING).
+        op.execute(f"""
+            CREATE FUNCTION {shadow}_mirror() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM {shadow} WHERE id = OLD.id;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {shadow} {MIRRORED_ROW[table]};
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        op.execute(
+            f'CREATE TRIGGER {shadow}_mirror AFTER INSERT OR UPDATE OR DELETE ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION {shadow}_mirror()'
+        )
+
+    # Highest id copied so far per table, so app.jobs.partition_copy can resume
+    op.create_table('partition_copy_progress',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('partition_copy_progress')
+    for table in reversed(list(TABLES)):
+        shadow = f'{table}_partitioned'
+        op.execute(f'DROP TRIGGER {shadow}_mirror ON {table}')
+        op.execute(f'DROP FUNCTION {shadow}_mirror()')
+        op.execute(f'DROP TABLE {shadow}')
@@ -0,0 +1,35 @@
+"""outbox feed sequence
+
+Feed positions (outbox_events.seq) come from their own sequence, so they
+keep growing after pruning has emptied the table. It starts after the
+highest position handed out so far.
+
+Revision ID: e1b5203f53fe
+Revises: 9b0b3afeff6f
+Create Date: 2026-10-19 19:18:18.737418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b5203f53fe'
+down_revision: Union[str, None] = '9b0b3afeff6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE SEQUENCE outbox_events_feed_seq AS bigint')
+    op.execute("""
+        SELECT setval('outbox_events_feed_seq', coalesce(max(seq), 0) + 1, false) FROM outbox_events
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP SEQUENCE outbox_events_feed_seq')
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.api.deps import get_db, require_admin_token
+from app.crud import crud_event
+from app.schemas.event import EventPage
+
+router = APIRouter(
+    tags=["Events"],
+    dependencies=[Depends(require_admin_token)],
+    responses={403: {"description": "Admin token required"}}
+)
+
+@router.get("/", response_model=EventPage)
+def list_events(
+    after: int = Query(0, ge=0, description="Cursor from the previous page's next_cursor"),
+    limit: int = Query(100, gt=0, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Published change events after the cursor, oldest first, for incremental sync."""
+    events = crud_event.get_events(db, after=after, limit=limit)
+    return {"events": events, "next_cursor": events[-1].seq if events else after}
@@ -0,0 +1,109 @@
+"""
+Probes for orchestrators and load balancers.
+
+/healthz answers as long as the process can serve HTTP and never touches
+the database, so a slow database doesn't get workers restarted. /readyz is
+what routing should follow: it fails (503) while the pool is about to run
+out, the database doesn't answer within READYZ_TIMEOUT_SECONDS, or the
+schema is not at the migration head this code was written against.
+Timing out only stops the probe waiting; the check keeps its thread and
+connection until DB_CONNECT_TIMEOUT or the statement timeout ends it, so
+concurrent probes share one in-flight check instead of starting more.
+
+Both bypass admission control and profiling.
+"""
+import asyncio
+import functools
+import logging
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db import session
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Health"])
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "alembic"
+
+@functools.lru_cache(maxsize=None)
+def migration_heads() -> frozenset:
+    """Head revision(s) of the migrations shipped with this code."""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return frozenset(ScriptDirectory.from_config(config).get_heads())
+
+def database_revisions(timeout: float) -> frozenset:
+    """The database's migration revision(s), bounded by a server-side statement timeout."""
+    with session.engine.connect() as connection:
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": str(int(timeout * 1000))}
+        )
+        # As cheap as SELECT 1, and also tells us the schema version
+        return frozenset(connection.scalars(text("SELECT version_num FROM alembic_version")))
+
+_database_check: Optional[asyncio.Future] = None
+
+def shared_database_check(timeout: float) -> asyncio.Future:
+    """The database check in flight, or a new one if there is none."""
+    global _database_check
+    check = _database_check
+    if check is None or check.done() or check.get_loop() is not asyncio.get_running_loop():
+        check = _database_check = asyncio.ensure_future(run_in_threadpool(database_revisions, timeout))
+        # Read here, so a failure nobody is still waiting for isn't logged as unhandled
+        check.add_done_callback(lambda future: future.cancelled() or future.exception())
+    return check
+
+def warm_up(app: FastAPI):
+    """Open pool connections and fill lazy caches before the first request."""
+    migration_heads()
+    app.openapi()
+    try:
+        opened = session.warm_up_pool()
+        logger.info("warmup: opened %d database connections", opened)
+    except Exception:
+        # Not fatal: /readyz keeps failing until the database is reachable
+        logger.exception("warmup: could not connect to the database")
+
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz():
+    free = session.pool_headroom()
+    checks = {
+        "pool": {
+            "ok": free >= settings.READYZ_MIN_FREE_CONNECTIONS,
+            "free": free,
+            "capacity": session.POOL_CAPACITY,
+        },
+    }
+    # A saturated pool would make the probe itself wait for a connection
+    if checks["pool"]["ok"]:
+        timeout = settings.READYZ_TIMEOUT_SECONDS
+        try:
+            # shield: a probe that gives up must not cancel the check others await
+            revisions = await asyncio.wait_for(asyncio.shield(shared_database_check(timeout)), timeout)
+        except Exception as e:
+            checks["database"] = {"ok": False, "error": type(e).__name__}
+        else:
+            checks["database"] = {"ok": True}
+            checks["migrations"] = {
+                "ok": revisions == migration_heads(),
+                "revision": sorted(revisions),
+                "head": sorted(migration_heads()),
+            }
+    ready = all(check["ok"] for check in checks.values()) and "migrations" in checks
+    return JSONResponse(
+        {"status": "ready" if ready else "unavailable", "checks": checks},
+        status_code=200 if ready else 503,
+    )
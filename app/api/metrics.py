@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics(request: Request):
+    """Prometheus text exposition of this worker's admission control counters."""
+    admission = getattr(request.app.state, "admission", None)
+    return admission.metrics.render() if admission else ""
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import HTMLResponse, Response
+from typing import List
+from app.api.deps import require_admin_token
+from app.core.profiling import ProfileStore
+from app.schemas.profile import ProfileOut
+
+router = APIRouter(
+    tags=["Profiling"],
+    dependencies=[Depends(require_admin_token)],
+    responses={403: {"description": "Admin token required"}}
+)
+
+def get_profile_store(request: Request) -> ProfileStore:
+    store = getattr(request.app.state, "profiles", None)
+    if store is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled.")
+    return store
+
+@router.get("/", response_model=List[ProfileOut])
+def list_profiles(store: ProfileStore = Depends(get_profile_store)):
+    """Profiles captured by this worker process, newest first."""
+    return store.recent()
+
+@router.get("/{profile_id}")
+def read_profile(
+    profile_id: int,
+    format: str = Query("html", pattern="^(html|speedscope)$"),
+    store: ProfileStore = Depends(get_profile_store)
+):
+    """One profile as a pyinstrument HTML report, or speedscope JSON for https://www.speedscope.app."""
+    profile = store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found.")
+    if format == "speedscope":
+        return Response(profile.render("speedscope"), media_type="application/json")
+    return HTMLResponse(profile.render("html"))
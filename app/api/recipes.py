@@ -1,17 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only
+from typing import List, Optional, Dict, Any, Literal
 from app.api.deps import get_db, get_current_user
-from app.models.recipe import Recipe, Favorite
-from app.crud import crud_recipe
-from app.schemas.recipe import RecipeCreate, RecipeOut
+from app.models.recipe import Recipe, Favorite, Ingredient, RecipeIngredient
+from app.crud import crud_card, crud_recipe, crud_sync
+from app.jobs.trending import TRENDING_SIZE
+from app.schemas.recipe import RecipeCreate, RecipeOut, PantryRecipeOut, ScoredRecipeOut, TrendingRecipeOut, RecipeCardOut
 from app.schemas.recipe import RecipeNoteCreate, RecipeNoteOut
+from app.schemas.fieldsets import parse_fields, dump_fields
+from app.schemas.sync import SyncOut
+
+# Largest DELETE /recipes?ids= request; crud_recipe batches it further
+MAX_BULK_DELETE = 500
 
 router = APIRouter(
     tags=["Recipes"],
     responses={404: {"description": "Not found"}}
 )
 
+def _scored_recipes(db: Session, rows, user_id: int):
+    # Attach score and favorites metadata to (recipe, score) rows
+    stats = crud_recipe.get_favorite_stats(db, [recipe.id for recipe, _ in rows], user_id)
+    recipes = []
+    for recipe, score in rows:
+        total_favorites, is_favorite = stats[recipe.id]
+        setattr(recipe, 'total_favorites', total_favorites)
+        setattr(recipe, 'is_favorite', is_favorite)
+        setattr(recipe, 'score', score)
+        recipes.append(recipe)
+    return recipes
+
 @router.post("/", response_model=RecipeOut, status_code=status.HTTP_201_CREATED)
 def create_new_recipe(
     recipe_in: RecipeCreate,
@@ -23,46 +42,140 @@ def create_new_recipe(
 @router.get("/", response_model=List[RecipeOut])
 def list_recipes(
     cuisine: Optional[str] = Query(None),
-    ingredients: Optional[str] = Query(None),
+    ingredients: Optional[str] = Query(None, description="An ingredient the recipe uses, matched by its normalized name"),
     tags: Optional[str] = Query(None),
     page: int = Query(1, gt=0),
     limit: int = Query(10, gt=0),
+    fields: Optional[str] = Query(None, description="Comma-separated RecipeOut fields to return, e.g. id,title,cuisine"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
+    try:
+        selected = parse_fields(fields, RecipeOut)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # Base query for recipes
     query = db.query(Recipe).filter(Recipe.owner_id == current_user.id)
+    if selected is not None:
+        # Only read the requested columns; steps in particular can be large
+        columns = [getattr(Recipe, name) for name in selected if name in Recipe.__table__.columns]
+        query = query.options(load_only(Recipe.id, *columns))
     
     # Apply filters
     if cuisine:
         query = query.filter(Recipe.cuisine.ilike(f"%{cuisine}%"))
     if ingredients:
-        query = query.filter(Recipe.ingredients.ilike(f"%{ingredients}%"))
+        # One unique-index lookup for the ingredient, then the inverted index
+        # rows of the owner's recipes only
+        ingredient_id = select(Ingredient.id).where(
+            Ingredient.name == crud_recipe.normalize_ingredient(ingredients)
+        ).scalar_subquery()
+        query = query.join(RecipeIngredient, RecipeIngredient.recipe_id == Recipe.id).filter(
+            RecipeIngredient.ingredient_id == ingredient_id
+        )
     if tags:
         query = query.filter(Recipe.tags.ilike(f"%{tags}%"))
     
     # Get paginated recipes
     recipes = query.offset((page - 1) * limit).limit(limit).all()
     
-    # Add favorites metadata to each recipe
-    for recipe in recipes:
-        # Get total favorites count
-        total_favorites = db.query(Favorite).filter(
-            Favorite.recipe_id == recipe.id
-        ).count()
-        
-        # Check if current user has favorited
-        is_favorite = db.query(Favorite).filter(
-            Favorite.recipe_id == recipe.id,
-            Favorite.user_id == current_user.id
-        ).first() is not None
-        
-        # Add favorites metadata
+    # Add favorites metadata to each recipe, unless the fieldset leaves it out
+    if selected is None or selected & {"total_favorites", "is_favorite"}:
+        stats = crud_recipe.get_favorite_stats(
+            db, [recipe.id for recipe in recipes], current_user.id, recipe_owner_id=current_user.id
+        )
+        for recipe in recipes:
+            total_favorites, is_favorite = stats[recipe.id]
+            setattr(recipe, 'total_favorites', total_favorites)
+            setattr(recipe, 'is_favorite', is_favorite)
+
+    if selected is not None:
+        return Response(dump_fields(RecipeOut, selected, recipes), media_type="application/json")
+    return recipes
+
+@router.get("/by-pantry", response_model=List[PantryRecipeOut])
+def list_recipes_by_pantry(
+    have: str = Query(..., description="Comma-separated ingredients you have"),
+    page: int = Query(1, gt=0),
+    limit: int = Query(10, gt=0),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    rows = crud_recipe.get_recipes_by_pantry(
+        db, current_user.id, have.split(","), skip=(page - 1) * limit, limit=limit
+    )
+    stats = crud_recipe.get_favorite_stats(
+        db, [recipe.id for recipe, _, _ in rows], current_user.id, recipe_owner_id=current_user.id
+    )
+    recipes = []
+    for recipe, matched, total in rows:
+        total_favorites, is_favorite = stats[recipe.id]
         setattr(recipe, 'total_favorites', total_favorites)
         setattr(recipe, 'is_favorite', is_favorite)
-    
+        setattr(recipe, 'matched_ingredients', matched)
+        setattr(recipe, 'total_ingredients', total)
+        setattr(recipe, 'coverage', matched / total)
+        recipes.append(recipe)
+
+    return recipes
+
+@router.get("/recommended", response_model=List[ScoredRecipeOut])
+def list_recommended_recipes(
+    limit: int = Query(10, gt=0, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    rows = crud_recipe.get_recommended_recipes(db, current_user.id, limit=limit)
+    return _scored_recipes(db, rows, current_user.id)
+
+@router.get("/trending", response_model=List[TrendingRecipeOut])
+def list_trending_recipes(
+    window: Literal["day", "week", "month"] = Query("week"),
+    limit: int = Query(10, gt=0, le=TRENDING_SIZE),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # Served from the rollup maintained by app.jobs.trending
+    rows = crud_recipe.get_trending_recipes(db, window, limit=limit)
+    favorited = crud_recipe.get_favorited_ids(db, [recipe.id for recipe, _ in rows], current_user.id)
+    recipes = []
+    for recipe, trending in rows:
+        setattr(recipe, 'total_favorites', trending.total_favorites)
+        setattr(recipe, 'is_favorite', recipe.id in favorited)
+        setattr(recipe, 'rank', trending.rank)
+        setattr(recipe, 'window_favorites', trending.window_favorites)
+        setattr(recipe, 'refreshed_at', trending.refreshed_at)
+        recipes.append(recipe)
     return recipes
 
+@router.get("/cards", response_model=List[RecipeCardOut])
+def list_recipe_cards(
+    after: Optional[int] = Query(None, description="Last card id of the previous page"),
+    limit: int = Query(20, gt=0, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # Prebuilt by app.jobs.recipe_cards and serialized by the database
+    cards = crud_card.get_recipe_cards(db, current_user.id, after=after, limit=limit)
+    return Response(cards, media_type="application/json")
+
+@router.get("/sync", response_model=SyncOut)
+def sync_recipes(
+    since: Optional[str] = Query(None, description="next_token from the previous sync; omit for a full sync"),
+    limit: int = Query(crud_sync.SYNC_PAGE_SIZE, gt=0, le=1000, description="Rows of each kind per page"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    try:
+        since_at, cursors = crud_sync.decode_token(since) if since else (None, None)
+    except (ValueError, OverflowError, OSError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if since_at is not None and crud_sync.token_expired(since_at):
+        raise HTTPException(status_code=410, detail="Sync token expired, sync again without since")
+
+    return crud_sync.get_changes(db, current_user.id, since_at, cursors, limit=limit)
+
 @router.get("/{recipe_id}", response_model=RecipeOut)
 def read_recipe(
     recipe_id: int,
@@ -70,19 +183,21 @@ def read_recipe(
     current_user = Depends(get_current_user)
 ):
     # Get recipe with favorite counts
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = crud_recipe.get_recipe(db, recipe_id)
     
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
     # Get total favorites count
     total_favorites = db.query(Favorite).filter(
-        Favorite.recipe_id == recipe_id
+        Favorite.recipe_id == recipe_id,
+        Favorite.recipe_owner_id == recipe.owner_id
     ).count()
     
     # Check if current user has favorited
     is_favorite = db.query(Favorite).filter(
         Favorite.recipe_id == recipe_id,
+        Favorite.recipe_owner_id == recipe.owner_id,
         Favorite.user_id == current_user.id
     ).first() is not None
 
@@ -92,6 +207,19 @@ def read_recipe(
     
     return recipe
 
+@router.get("/{recipe_id}/similar", response_model=List[ScoredRecipeOut])
+def list_similar_recipes(
+    recipe_id: int,
+    limit: int = Query(10, gt=0, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    recipe = crud_recipe.get_recipe(db, recipe_id)
+    if not recipe:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    rows = crud_recipe.get_similar_recipes(db, recipe_id, limit=limit)
+    return _scored_recipes(db, rows, current_user.id)
+
 @router.put("/{recipe_id}", response_model=RecipeOut)
 def replace_recipe(
     recipe_id: int,
@@ -99,7 +227,7 @@ def replace_recipe(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id, Recipe.owner_id == current_user.id).first()
+    recipe = crud_recipe.get_recipe(db, recipe_id, owner_id=current_user.id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     return crud_recipe.update_recipe(db, recipe, recipe_in)
@@ -111,18 +239,34 @@ def partial_update_recipe(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id, Recipe.owner_id == current_user.id).first()
+    recipe = crud_recipe.get_recipe(db, recipe_id, owner_id=current_user.id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     return crud_recipe.partial_update_recipe(db, recipe, update_data)
 
+@router.delete("/", status_code=status.HTTP_200_OK)
+def remove_recipes(
+    ids: str = Query(..., description=f"Comma-separated recipe ids, at most {MAX_BULK_DELETE}"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    try:
+        recipe_ids = {int(i) for i in ids.split(",") if i.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not recipe_ids or len(recipe_ids) > MAX_BULK_DELETE:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MAX_BULK_DELETE} ids")
+    deleted = crud_recipe.delete_recipes(db, current_user.id, recipe_ids)
+    # Ids that don't exist or belong to someone else are reported, not deleted
+    return {"deleted": deleted, "not_found": sorted(recipe_ids - set(deleted))}
+
 @router.delete("/{recipe_id}", status_code=status.HTTP_200_OK)
 def remove_recipe(
     recipe_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id, Recipe.owner_id == current_user.id).first()
+    recipe = crud_recipe.get_recipe(db, recipe_id, owner_id=current_user.id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     crud_recipe.delete_recipe(db, recipe)
@@ -135,13 +279,14 @@ def mark_favorite(
     current_user = Depends(get_current_user)
 ):
     # First check if recipe exists
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = crud_recipe.get_recipe(db, recipe_id)
     if not recipe:
         raise HTTPException(status_code=400, detail="Recipe not found")
     
     # Check if already favorited
     existing_favorite = db.query(Favorite).filter(
         Favorite.recipe_id == recipe_id,
+        Favorite.recipe_owner_id == recipe.owner_id,
         Favorite.user_id == current_user.id
     ).first()
     
@@ -149,13 +294,7 @@ def mark_favorite(
         raise HTTPException(status_code=400, detail="Recipe already marked as favorite")
     
     try:
-        # Create new favorite
-        new_favorite = Favorite(
-            recipe_id=recipe_id,
-            user_id=current_user.id
-        )
-        db.add(new_favorite)
-        db.commit()
+        crud_recipe.add_favorite(db, recipe, current_user.id)
         return {"msg": "Recipe marked as favorite"}
     except Exception as e:
         db.rollback()
@@ -168,24 +307,21 @@ def remove_favorite(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    # Check if favorite exists
-    favorite = db.query(Favorite).filter(
-        Favorite.recipe_id == recipe_id,
-        Favorite.user_id == current_user.id
-    ).first()
-    
-    if not favorite:
+    recipe = crud_recipe.get_recipe(db, recipe_id)
+    if not recipe:
         raise HTTPException(status_code=400, detail="Recipe was not marked as favorite")
-    
+
     try:
-        db.delete(favorite)
-        db.commit()
-        return {"msg": "Favorite removed"}
+        favorite = crud_recipe.remove_favorite(db, recipe, current_user.id)
     except Exception as e:
         db.rollback()
         print(f"Error removing favorite: {str(e)}")  # For debugging
         raise HTTPException(status_code=400, detail="Could not remove favorite")
 
+    if not favorite:
+        raise HTTPException(status_code=400, detail="Recipe was not marked as favorite")
+    return {"msg": "Favorite removed"}
+
 @router.post("/{recipe_id}/notes", response_model=RecipeNoteOut, status_code=status.HTTP_201_CREATED)
 def add_recipe_note(
     recipe_id: int,
@@ -193,20 +329,27 @@ def add_recipe_note(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id, Recipe.owner_id == current_user.id).first()
+    recipe = crud_recipe.get_recipe(db, recipe_id, owner_id=current_user.id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    note = crud_recipe.add_recipe_note(db, recipe_id, current_user.id, note_in)
+    note = crud_recipe.add_recipe_note(db, recipe, current_user.id, note_in)
     return note
 
 @router.get("/{recipe_id}/notes", response_model=List[RecipeNoteOut])
 def list_recipe_notes(
     recipe_id: int,
+    after: Optional[int] = Query(None, description="Id of the last note on the previous page"),
+    limit: int = Query(50, gt=0, le=200),
+    include_author: bool = Query(False, description="Embed each note's author"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id, Recipe.owner_id == current_user.id).first()
-    if not recipe:
+    notes = crud_recipe.get_recipe_notes(
+        db, recipe_id, current_user.id, after=after, limit=limit, include=["user"] if include_author else []
+    )
+    if notes is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    notes = crud_recipe.get_recipe_notes(db, recipe_id)
-    return notes
\ No newline at end of file
+    if include_author:
+        for note in notes:
+            setattr(note, 'author', note.user)
+    return notes
@@ -1,7 +1,19 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.api.deps import get_current_user, get_db
+from app.crud import crud_stats
+from app.schemas.user import UserStatsOut
 
 router = APIRouter()
 
 @router.get("/")
 def read_users():
-    return {"message": "User endpoints"}
\ No newline at end of file
+    return {"message": "User endpoints"}
+
+@router.get("/me/stats", response_model=UserStatsOut)
+def read_my_stats(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Dashboard numbers for the current user: recipes by cuisine, top ingredients, favorites and notes."""
+    return crud_stats.get_user_stats(db, current_user.id)
@@ -7,6 +7,8 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Shared secret for internal/admin endpoints (X-Admin-Token); unset disables them
+    ADMIN_TOKEN: str | None = None
 
     DB_HOST: str = "localhost"           # ← new setting
     POSTGRES_USER: str
@@ -14,6 +16,48 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     SQLALCHEMY_DATABASE_URL: PostgresDsn | None = None
 
+    # Connection pool (see app/db/session.py); /readyz fails once fewer than
+    # READYZ_MIN_FREE_CONNECTIONS of DB_POOL_SIZE + DB_MAX_OVERFLOW are free
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30          # seconds a request waits for a connection
+    DB_POOL_WARMUP: int = 5              # connections opened at startup
+    DB_CONNECT_TIMEOUT: int = 5          # seconds to open a new connection before giving up
+    READYZ_TIMEOUT_SECONDS: float = 1.0
+    READYZ_MIN_FREE_CONNECTIONS: int = 1
+
+    # Admission control (see app/core/rate_limit.py)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"   # "memory" (per process) or "redis" (shared)
+    REDIS_URL: str = "redis://localhost:6379/0"
+    # Comma-separated proxy addresses/CIDRs allowed to set X-Forwarded-For;
+    # empty means per-IP limits use the connecting address
+    TRUSTED_PROXIES: str = ""
+    AUTH_RATE_PER_MINUTE_PER_IP: float = 20
+    AUTH_BURST_PER_IP: int = 20
+    LOGIN_RATE_PER_MINUTE_PER_ACCOUNT: float = 5
+    LOGIN_BURST_PER_ACCOUNT: int = 10
+    WRITE_RATE_PER_MINUTE: float = 300
+    WRITE_BURST: int = 120
+    MAX_CONCURRENT_REQUESTS: int = 64
+    MAX_CONCURRENT_AUTH_REQUESTS: int = 4   # bcrypt is CPU bound; keep near the core count
+    MAX_QUEUED_REQUESTS: int = 128
+    QUEUE_TIMEOUT_SECONDS: float = 2.0
+
+    # Response compression (see app/core/compression.py)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4   # low qualities are the sweet spot for dynamic JSON
+
+    # GET /users/me/stats entries live this long in each worker's cache
+    USER_STATS_CACHE_SECONDS: float = 60
+
+    # Per-request CPU profiling (see app/core/profiling.py); off means zero overhead
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0   # fraction of requests profiled without asking
+    PROFILING_BUFFER_SIZE: int = 50      # profiles kept per worker process
+    PROFILING_INTERVAL: float = 0.001    # pyinstrument sampling interval, seconds
+
     @field_validator("SQLALCHEMY_DATABASE_URL", mode="before")
     def assemble_db_connection(cls, v, info):
         if isinstance(v, str):
@@ -0,0 +1,184 @@
+"""
+On-demand CPU profiles of single requests, kept in a bounded ring buffer.
+
+Off by default, and then nothing here is installed, so requests pay nothing.
+With PROFILING_ENABLED a request is profiled when it sends `X-Profile: 1`
+together with a valid X-Admin-Token, or at random with probability
+PROFILING_SAMPLE_RATE.
+
+pyinstrument samples the request on the event loop thread. Routes declared
+with `def` (list_recipes and most of this API) run their endpoint and the
+response model validation in the threadpool, where a loop-thread profiler
+only sees "[await]". instrument_routes() wraps those two calls so they are
+profiled in the worker thread as well, and the sessions are combined into
+one profile. Sync dependencies (get_db, get_current_user) are left
+unwrapped and show up as awaited time.
+
+Each worker process keeps its own buffer; /admin/profiles serves it as HTML
+or speedscope JSON.
+"""
+import asyncio
+import functools
+import itertools
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi.routing import APIRoute
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+
+# Worker-thread sessions of the request being profiled, if any. The
+# threadpool runs each call in a copy of the caller's context, so the
+# wrappers below see the list the middleware set.
+_worker_sessions: ContextVar[Optional[list]] = ContextVar("worker_sessions", default=None)
+
+
+@dataclass
+class RequestProfile:
+    id: int
+    method: str
+    path: str
+    status_code: int
+    duration_ms: float
+    trigger: str  # "admin" or "sampled"
+    created_at: datetime
+    session: object  # pyinstrument.session.Session
+
+    def render(self, fmt: str) -> str:
+        from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+        renderer = SpeedscopeRenderer() if fmt == "speedscope" else HTMLRenderer()
+        return renderer.render(self.session)
+
+
+class ProfileStore:
+    """The last `size` profiles, newest first; older ones fall off the end."""
+
+    def __init__(self, size: int = 50):
+        self._profiles: deque = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, **fields) -> RequestProfile:
+        with self._lock:
+            profile = RequestProfile(id=next(self._ids), **fields)
+            self._profiles.appendleft(profile)
+        return profile
+
+    def recent(self) -> list:
+        with self._lock:
+            return list(self._profiles)
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+
+def profiled_in_worker(func, interval: float = 0.001):
+    """Wrap a sync callable so it is profiled when its request is."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        sessions = _worker_sessions.get()
+        if sessions is None:
+            return func(*args, **kwargs)
+        from pyinstrument import Profiler
+        profiler = Profiler(interval=interval, async_mode="disabled")
+        profiler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sessions.append(profiler.stop())
+
+    return wrapper
+
+
+def instrument_routes(routes, interval: float = 0.001):
+    """Profile the threadpool calls of every sync route (call once, at startup)."""
+    for route in routes:
+        if not isinstance(route, APIRoute) or route.dependant.call is None:
+            continue
+        # The request handler looks both of these up on every call.
+        if not asyncio.iscoroutinefunction(route.dependant.call):
+            route.dependant.call = profiled_in_worker(route.dependant.call, interval)
+            field = route.secure_cloned_response_field
+            if field is not None:
+                field.validate = profiled_in_worker(field.validate, interval)
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        sample_rate: float = 0.0,
+        admin_token: Optional[str] = None,
+        interval: float = 0.001,
+        exempt_paths: tuple = ("/admin/profiles", "/metrics", "/healthz", "/readyz"),
+    ):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self.interval = interval
+        self.exempt_paths = exempt_paths
+
+    def _trigger(self, scope) -> Optional[str]:
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER) == b"1" and self.admin_token and secrets.compare_digest(
+            headers.get(ADMIN_TOKEN_HEADER, b""), self.admin_token.encode()
+        ):
+            return "admin"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+        from pyinstrument.session import Session
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        sessions = []
+        token = _worker_sessions.set(sessions)
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session = profiler.stop()
+            duration_ms = (time.perf_counter() - started) * 1000
+            _worker_sessions.reset(token)
+            for worker_session in sessions:
+                session = Session.combine(session, worker_session)
+            self.store.add(
+                method=scope["method"],
+                path=scope["path"],
+                status_code=status_code,
+                duration_ms=round(duration_ms, 2),
+                trigger=trigger,
+                created_at=datetime.now(timezone.utc),
+                session=session,
+            )
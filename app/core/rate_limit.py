@@ -0,0 +1,374 @@
+"""
+Admission control: token-bucket rate limits plus concurrency limits.
+
+Login and registration each cost a bcrypt hash, so an unbounded burst of
+them saturates the CPU and starves every other request. The middleware
+below rejects a request before it reaches a route when either
+
+* a token bucket for its client IP or account is empty (429), or
+* the global concurrency limit, or the smaller limit for the auth routes,
+  is full and the short wait queue is too (503).
+
+Both responses carry Retry-After. Buckets live in process memory by
+default, or in Redis when several workers must share them.
+
+Behind a load balancer every connection comes from the proxy, so the
+client IP is taken from X-Forwarded-For when the connecting peer is one
+of TRUSTED_PROXIES (see client_ip()). The header is ignored otherwise, so
+clients cannot pick their own bucket.
+"""
+import asyncio
+import ipaddress
+import json
+import logging
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import parse_qs
+
+from app.core.security import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+# Largest body buffered to find the account on the auth routes.
+MAX_AUTH_BODY_BYTES = 64 * 1024
+AUTH_PATHS = ("/auth/login", "/auth/register")
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+SHED_RETRY_AFTER_SECONDS = 1
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    methods: frozenset
+    path_prefixes: tuple
+    key: str  # "ip" or "account"
+    per_minute: float
+    burst: int
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and path.startswith(self.path_prefixes)
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+
+class InMemoryBackend:
+    """Token buckets in a bounded LRU dict; limits are per process."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()
+
+    async def acquire(self, key: str, rate: float, capacity: int, now: float, cost: int = 1):
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            # Forget the least recently seen client; its bucket starts full again.
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+# Refill, take and store atomically inside Redis. Floats are returned as
+# strings because Redis truncates Lua numbers to integers.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisBackend:
+    """Token buckets shared by every worker through Redis (redis.asyncio client)."""
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.prefix = prefix
+        self._script = client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def acquire(self, key: str, rate: float, capacity: int, now: float, cost: int = 1):
+        allowed, retry_after = await self._script(
+            keys=[self.prefix + key], args=[rate, capacity, now, cost]
+        )
+        return bool(allowed), float(retry_after)
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` requests in flight, at most `max_queue` waiting for a slot.
+
+    Waiters give up after `queue_timeout` seconds, so queueing delay stays
+    bounded instead of growing with the backlog.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque = deque()
+
+    async def acquire(self) -> bool:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self):
+        # Hand the slot straight to the oldest waiter, if any.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionMetrics:
+    """Admitted/rejected request counters, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+
+    def record(self, decision: str, reason: str, rule: str = ""):
+        self.counts[(decision, reason, rule)] += 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP khanakahani_admission_total Requests admitted or rejected by admission control.",
+            "# TYPE khanakahani_admission_total counter",
+        ]
+        for (decision, reason, rule), count in sorted(self.counts.items()):
+            lines.append(
+                f'khanakahani_admission_total{{decision="{decision}",reason="{reason}",rule="{rule}"}} {count}'
+            )
+        return "\n".join(lines) + "\n"
+
+
+class AdmissionControl:
+    def __init__(
+        self,
+        backend,
+        rules: list,
+        global_limiter: ConcurrencyLimiter,
+        auth_limiter: Optional[ConcurrencyLimiter] = None,
+        exempt_paths: tuple = ("/metrics", "/healthz", "/readyz"),
+        trusted_proxies: tuple = (),
+    ):
+        self.backend = backend
+        self.rules = rules
+        self.global_limiter = global_limiter
+        self.auth_limiter = auth_limiter
+        self.exempt_paths = exempt_paths
+        self.trusted_proxies = trusted_proxies
+        self.metrics = AdmissionMetrics()
+
+
+def parse_trusted_proxies(value: str) -> tuple:
+    """Comma-separated addresses or CIDR ranges, e.g. "10.0.0.0/8, 127.0.0.1"."""
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip())
+
+
+def _is_trusted(address: str, trusted_proxies: tuple) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def client_ip(peer: str, headers: dict, trusted_proxies: tuple) -> str:
+    """
+    The address to rate limit: the peer itself, or, when the peer is a
+    trusted proxy, the nearest X-Forwarded-For hop that is not one.
+
+    Hops are read right to left because each proxy appends the address it
+    saw; entries further left were written by the client and prove nothing.
+    """
+    if not _is_trusted(peer, trusted_proxies):
+        return peer
+    hops = [hop.strip() for hop in headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted_proxies):
+            return hop
+    # Only proxies in the chain (or no header): the leftmost is the best we have
+    return hops[0] if hops else peer
+
+
+def build_admission_control(settings) -> AdmissionControl:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        import redis.asyncio
+        backend = RedisBackend(redis.asyncio.Redis.from_url(settings.REDIS_URL))
+    else:
+        backend = InMemoryBackend()
+    auth = frozenset({"POST"})
+    rules = [
+        RateLimitRule("auth_ip", auth, AUTH_PATHS, "ip",
+                      settings.AUTH_RATE_PER_MINUTE_PER_IP, settings.AUTH_BURST_PER_IP),
+        RateLimitRule("login_account", auth, ("/auth/login",), "account",
+                      settings.LOGIN_RATE_PER_MINUTE_PER_ACCOUNT, settings.LOGIN_BURST_PER_ACCOUNT),
+        RateLimitRule("write_ip", WRITE_METHODS, ("/recipes",), "ip",
+                      settings.WRITE_RATE_PER_MINUTE, settings.WRITE_BURST),
+        RateLimitRule("write_account", WRITE_METHODS, ("/recipes",), "account",
+                      settings.WRITE_RATE_PER_MINUTE, settings.WRITE_BURST),
+    ]
+    return AdmissionControl(
+        backend,
+        rules,
+        ConcurrencyLimiter("global", settings.MAX_CONCURRENT_REQUESTS, settings.MAX_QUEUED_REQUESTS,
+                           settings.QUEUE_TIMEOUT_SECONDS),
+        ConcurrencyLimiter("auth", settings.MAX_CONCURRENT_AUTH_REQUESTS, settings.MAX_QUEUED_REQUESTS,
+                           settings.QUEUE_TIMEOUT_SECONDS),
+        trusted_proxies=parse_trusted_proxies(settings.TRUSTED_PROXIES),
+    )
+
+
+def _account_from_body(path: str, body: bytes) -> Optional[str]:
+    # The account under attack, before any bcrypt work is spent on it.
+    try:
+        if path.startswith("/auth/login"):
+            return parse_qs(body.decode())["username"][0].strip().lower()
+        if path.startswith("/auth/register"):
+            return str(json.loads(body)["email"]).strip().lower()
+    except (KeyError, IndexError, ValueError, TypeError, UnicodeDecodeError):
+        return None
+    return None
+
+
+def _account_from_token(headers: dict) -> Optional[str]:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_access_token(token)
+    return f"user:{payload['sub']}" if payload and payload.get("sub") else None
+
+
+async def _send_json(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app, control: AdmissionControl):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.control.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+        control = self.control
+        method, path = scope["method"], scope["path"]
+        rules = [rule for rule in control.rules if rule.matches(method, path)]
+        is_auth = method == "POST" and path.startswith(AUTH_PATHS)
+
+        if rules:
+            headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+            account = _account_from_token(headers)
+            if is_auth:
+                receive, body = await _buffer_body(receive)
+                account = _account_from_body(path, body) or account
+            peer = (scope.get("client") or ("unknown",))[0]
+            keys = {"ip": client_ip(peer, headers, control.trusted_proxies), "account": account}
+            now = time.time()
+            for rule in rules:
+                key = keys[rule.key]
+                if key is None:
+                    continue
+                try:
+                    allowed, retry_after = await control.backend.acquire(
+                        f"{rule.name}:{key}", rule.rate, rule.burst, now
+                    )
+                except Exception:
+                    # A broken shared store must not take the API down with it.
+                    logger.exception("rate limit backend failed; admitting request")
+                    continue
+                if not allowed:
+                    control.metrics.record("rejected", "rate_limit", rule.name)
+                    await _send_json(send, 429, "Too many requests", retry_after)
+                    return
+
+        limiters = [control.global_limiter]
+        if is_auth and control.auth_limiter is not None:
+            limiters.append(control.auth_limiter)
+        acquired = []
+        try:
+            for limiter in limiters:
+                if not await limiter.acquire():
+                    control.metrics.record("rejected", "overloaded", limiter.name)
+                    await _send_json(send, 503, "Server busy, retry later", SHED_RETRY_AFTER_SECONDS)
+                    return
+                acquired.append(limiter)
+            control.metrics.record("admitted", "ok")
+            await self.app(scope, receive, send)
+        finally:
+            for limiter in acquired:
+                limiter.release()
+
+
+async def _buffer_body(receive):
+    """Read the request body up front and return a receive() that replays it."""
+    chunks, size, more = [], 0, True
+    while more:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        more = message.get("more_body", False) and size <= MAX_AUTH_BODY_BYTES
+    body = b"".join(chunks)
+    # Anything past the cap is left for the app to read from the real stream.
+    pending = [{"type": "http.request", "body": body, "more_body": size > MAX_AUTH_BODY_BYTES}]
+
+    async def replay():
+        return pending.pop() if pending else await receive()
+
+    return replay, body
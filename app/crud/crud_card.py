@@ -0,0 +1,37 @@
+"""
+Prebuilt recipe cards for listing screens.
+
+Writes that change what a card shows (the recipe itself, its favorites or
+its notes) queue the recipe in `stale_recipe_cards` inside their own
+transaction. app.jobs.recipe_cards drains the queue and renders the cards,
+so GET /recipes/cards reads one index range and never aggregates on request.
+Cards trail writes by the worker's polling interval.
+"""
+from typing import Optional
+from sqlalchemy import Text, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.card import RecipeCard, StaleRecipeCard
+
+def mark_cards_stale(db: Session, *recipe_ids: int):
+    """Queue the recipes' cards for rendering (caller commits)."""
+    rows = [{"recipe_id": recipe_id} for recipe_id in sorted(set(recipe_ids))]
+    if not rows:
+        return
+    statement = pg_insert(StaleRecipeCard).values(rows)
+    # DO UPDATE rather than DO NOTHING: it row-locks an entry that is already
+    # queued, so a worker (which skips locked entries) cannot render and
+    # dequeue the recipe before this transaction's change is visible.
+    db.execute(statement.on_conflict_do_update(
+        index_elements=["recipe_id"],
+        set_={"queued_at": statement.excluded.queued_at},
+    ))
+
+def get_recipe_cards(db: Session, owner_id: int, after: Optional[int] = None, limit: int = 20) -> str:
+    """A page of the owner's cards, newest recipe first, as a serialized JSON array."""
+    page = select(RecipeCard.recipe_id, RecipeCard.card).where(RecipeCard.owner_id == owner_id)
+    if after is not None:
+        page = page.where(RecipeCard.recipe_id < after)
+    page = page.order_by(RecipeCard.recipe_id.desc()).limit(limit).subquery()
+    cards = func.json_agg(aggregate_order_by(page.c.card, page.c.recipe_id.desc()))
+    return db.scalar(select(cast(func.coalesce(cards, literal_column("'[]'::json")), Text)))
@@ -0,0 +1,23 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.event import OutboxEvent
+
+def record_event(db: Session, aggregate: str, aggregate_id: int, action: str, user_id: int = None, **payload) -> OutboxEvent:
+    """Stage an outbox event in the caller's transaction; it commits or rolls back with the change."""
+    event = OutboxEvent(
+        aggregate=aggregate,
+        aggregate_id=aggregate_id,
+        action=action,
+        user_id=user_id,
+        payload=payload,
+    )
+    db.add(event)
+    return event
+
+def get_events(db: Session, after: int = 0, limit: int = 100):
+    return db.scalars(
+        select(OutboxEvent)
+        .where(OutboxEvent.seq > after)
+        .order_by(OutboxEvent.seq)
+        .limit(limit)
+    ).all()
@@ -1,53 +1,394 @@
-from sqlalchemy.orm import Session
+from collections import Counter
+from sqlalchemy import delete, func, insert, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by, insert as pg_insert
+from sqlalchemy.orm import Session, joinedload, selectinload
 from datetime import datetime, timezone
-from app.models.recipe import Recipe
+from typing import Iterable, List
+from app.models.recipe import Recipe, Favorite, Ingredient, RecipeIngredient
+from app.models.archive import RecipeArchive
+from app.models.card import StaleRecipeCard
+from app.models.recommendation import RecipeNeighbor
+from app.models.trending import TrendingRecipe
+from app.crud.crud_card import mark_cards_stale
+from app.crud.crud_event import record_event
+from app.crud.crud_stats import (
+    add_favorites_received, adjust_ingredient_counts, invalidate_user_stats,
+)
+from app.crud.crud_sync import record_recipe_tombstones, record_tombstone
 from app.models.recipe import RecipeNote
 from app.schemas.recipe import RecipeCreate, RecipeNoteCreate, RecipeNoteOut, RecipeOut
 
+DELETE_BATCH_SIZE = 100
+
+# Every relationship is lazy="raise_on_sql", so whatever a response will
+# touch has to be loaded with the query. Callers opt in by name. Recipe.owner
+# is one row per recipe, so it rides along in a JOIN; collections, and the
+# authors of a page of notes (usually the same few users), come from one
+# extra IN query each instead of widening every row.
+RECIPE_LOADERS = {
+    "owner": joinedload(Recipe.owner),
+    "favorites": selectinload(Recipe.favorites),
+    "notes": selectinload(Recipe.notes),
+    "notes.user": selectinload(Recipe.notes).selectinload(RecipeNote.user),
+}
+NOTE_LOADERS = {
+    "recipe": joinedload(RecipeNote.recipe),
+    "user": selectinload(RecipeNote.user),
+}
+
+def loader_options(loaders: dict, include: Iterable[str] = ()) -> list:
+    """Loader options for the named relationships, e.g. loader_options(RECIPE_LOADERS, ["owner"])."""
+    unknown = set(include) - loaders.keys()
+    if unknown:
+        raise ValueError(f"Cannot load {', '.join(sorted(unknown))}")
+    return [loaders[name] for name in include]
+
+def normalize_ingredient(name: str) -> str:
+    # Keep in sync with the backfill in the ingredient inverted index migration.
+    return " ".join(name.split()).lower()
+
+def normalize_ingredients(names: Iterable[str]) -> List[str]:
+    # Sorted so concurrent writers upsert shared ingredients in the same order.
+    return sorted({normalize_ingredient(name) for name in names if name and name.strip()})
+
+def _sync_recipe_ingredients(db: Session, recipe: Recipe):
+    """
+    Rebuild the recipe's rows in the ingredient inverted index (caller commits).
+
+    The owner's ingredient counts are adjusted by the difference.
+    """
+    names = normalize_ingredients(recipe.ingredients or [])
+    removed = db.scalars(
+        delete(RecipeIngredient)
+        .where(RecipeIngredient.recipe_id == recipe.id)
+        .returning(RecipeIngredient.ingredient_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    added = []
+    if names:
+        db.execute(
+            pg_insert(Ingredient)
+            .values([{"name": name} for name in names])
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        added = db.scalars(
+            insert(RecipeIngredient).from_select(
+                ["recipe_id", "ingredient_id"],
+                select(literal(recipe.id), Ingredient.id).where(Ingredient.name.in_(names)),
+            ).returning(RecipeIngredient.ingredient_id)
+        ).all()
+    deltas = Counter(added)
+    deltas.subtract(removed)
+    adjust_ingredient_counts(db, recipe.owner_id, deltas)
+
 def create_recipe(db: Session, recipe_in: RecipeCreate, owner_id: int) -> Recipe:
     recipe = Recipe(**recipe_in.dict(), owner_id=owner_id)
     db.add(recipe)
+    db.flush()
+    _sync_recipe_ingredients(db, recipe)
+    record_event(db, "recipe", recipe.id, "created", owner_id)
+    mark_cards_stale(db, recipe.id)
     db.commit()
+    invalidate_user_stats(owner_id)
     db.refresh(recipe)
     return recipe
 
 def update_recipe(db: Session, recipe: Recipe, recipe_in: RecipeCreate) -> Recipe:
     for field, value in recipe_in.dict().items():
         setattr(recipe, field, value)
+    _sync_recipe_ingredients(db, recipe)
+    record_event(db, "recipe", recipe.id, "updated", recipe.owner_id, fields=sorted(recipe_in.dict()))
+    mark_cards_stale(db, recipe.id)
     db.commit()
     db.refresh(recipe)
+    invalidate_user_stats(recipe.owner_id)
     return recipe
 
 def partial_update_recipe(db: Session, recipe: Recipe, update_data: dict) -> Recipe:
     for field, value in update_data.items():
         setattr(recipe, field, value)
+    if "ingredients" in update_data:
+        _sync_recipe_ingredients(db, recipe)
+    record_event(db, "recipe", recipe.id, "updated", recipe.owner_id, fields=sorted(update_data))
+    mark_cards_stale(db, recipe.id)
     db.commit()
     db.refresh(recipe)
+    invalidate_user_stats(recipe.owner_id)
     return recipe
 
 def delete_recipe(db: Session, recipe: Recipe):
-    db.delete(recipe)
+    delete_recipes(db, recipe.owner_id, [recipe.id])
+
+def _archive_recipes(db: Session, owner_id: int, recipe_ids: List[int]):
+    """Snapshot recipes and their notes into recipe_archive (caller commits)."""
+    notes = (
+        select(func.jsonb_agg(aggregate_order_by(
+            func.to_jsonb(RecipeNote.__table__.table_valued()), RecipeNote.created_at, RecipeNote.id
+        )))
+        .where(RecipeNote.recipe_id == Recipe.id, RecipeNote.recipe_owner_id == Recipe.owner_id)
+        .scalar_subquery()
+    )
+    favorites = (
+        select(func.count())
+        .where(Favorite.recipe_id == Recipe.id, Favorite.recipe_owner_id == Recipe.owner_id)
+        .scalar_subquery()
+    )
+    db.execute(insert(RecipeArchive).from_select(
+        ["id", "owner_id", "recipe", "notes", "favorites_count"],
+        select(
+            Recipe.id,
+            Recipe.owner_id,
+            func.to_jsonb(Recipe.__table__.table_valued()),
+            func.coalesce(notes, literal([], JSONB)),
+            favorites,
+        ).where(Recipe.id.in_(recipe_ids), Recipe.owner_id == owner_id),
+    ))
+
+def _delete_recipe_batch(db: Session, owner_id: int, recipe_ids: List[int]) -> List[int]:
+    # Lock in id order so overlapping bulk deletes cannot deadlock.
+    ids = db.scalars(
+        select(Recipe.id)
+        .where(Recipe.id.in_(recipe_ids), Recipe.owner_id == owner_id)
+        .order_by(Recipe.id)
+        .with_for_update()
+    ).all()
+    if not ids:
+        return []
+    for recipe_id in ids:
+        record_event(db, "recipe", recipe_id, "deleted", owner_id)
+    record_recipe_tombstones(db, owner_id, ids)
+    _archive_recipes(db, owner_id, ids)
+
+    removed = db.scalars(
+        delete(RecipeIngredient)
+        .where(RecipeIngredient.recipe_id.in_(ids))
+        .returning(RecipeIngredient.ingredient_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    adjust_ingredient_counts(db, owner_id, {i: -n for i, n in Counter(removed).items()})
+    add_favorites_received(db, owner_id, -db.scalar(
+        select(func.count()).where(Favorite.recipe_owner_id == owner_id, Favorite.recipe_id.in_(ids))
+    ))
+    note_authors = set(db.scalars(
+        select(RecipeNote.user_id)
+        .where(RecipeNote.recipe_owner_id == owner_id, RecipeNote.recipe_id.in_(ids))
+        .distinct()
+    ))
+
+    # These can't reference the partitioned recipes table by id alone.
+    db.execute(delete(RecipeNeighbor).where(
+        RecipeNeighbor.recipe_id.in_(ids) | RecipeNeighbor.neighbor_id.in_(ids)
+    ))
+    db.execute(delete(TrendingRecipe).where(TrendingRecipe.recipe_id.in_(ids)))
+    db.execute(delete(StaleRecipeCard).where(StaleRecipeCard.recipe_id.in_(ids)))
+    # Favorites, notes and cards go with ON DELETE CASCADE.
+    db.execute(delete(Recipe).where(Recipe.owner_id == owner_id, Recipe.id.in_(ids)))
     db.commit()
+    invalidate_user_stats(owner_id, *note_authors)
+    return ids
+
+def delete_recipes(db: Session, owner_id: int, recipe_ids: Iterable[int], batch_size: int = DELETE_BATCH_SIZE) -> List[int]:
+    """
+    Move the owner's recipes to recipe_archive and return the ids deleted.
+
+    Ids that are not the owner's are skipped. Work is done in batches of
+    `batch_size`, each in its own short transaction, so a large delete
+    never holds row locks for long; an error leaves earlier batches done.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    deleted = []
+    for i in range(0, len(recipe_ids), batch_size):
+        deleted.extend(_delete_recipe_batch(db, owner_id, recipe_ids[i:i + batch_size]))
+    return deleted
+
+def get_recipe(db: Session, recipe_id: int, owner_id: int | None = None, include: Iterable[str] = ()) -> Recipe | None:
+    """The recipe, optionally only if owner_id owns it, with the named relationships loaded."""
+    statement = select(Recipe).where(Recipe.id == recipe_id).options(*loader_options(RECIPE_LOADERS, include))
+    if owner_id is not None:
+        statement = statement.where(Recipe.owner_id == owner_id)
+    return db.scalars(statement).unique().first()
 
-def add_favorite(db: Session, recipe_id: int, user_id: int):
-    # implementation for adding a favorite remains here
-    pass
+def get_recipes_by_pantry(db: Session, owner_id: int, have: Iterable[str], skip: int = 0, limit: int = 10):
+    """
+    Rank the owner's recipes by how much of their ingredient list is covered by `have`.
 
-def remove_favorite(db: Session, recipe_id: int, user_id: int):
-    # implementation for removing favorite
-    pass
+    Returns (recipe, matched_count, total_count) tuples. Only recipes sharing at
+    least one ingredient with the pantry are considered. The owner filter is
+    applied before counting matches, so the work grows with the owner's
+    collection rather than with everyone's recipes that use those ingredients.
+    """
+    names = normalize_ingredients(have)
+    if not names:
+        return []
+    ingredient_ids = select(Ingredient.id).where(Ingredient.name.in_(names))
+    matched = (
+        select(RecipeIngredient.recipe_id, func.count().label("matched"))
+        .join(Recipe, Recipe.id == RecipeIngredient.recipe_id)
+        .where(Recipe.owner_id == owner_id, RecipeIngredient.ingredient_id.in_(ingredient_ids))
+        .group_by(RecipeIngredient.recipe_id)
+        .subquery()
+    )
+    total = (
+        select(func.count())
+        .where(RecipeIngredient.recipe_id == Recipe.id)
+        .correlate(Recipe)
+        .scalar_subquery()
+    )
+    coverage = matched.c.matched * 1.0 / total
+    return db.execute(
+        select(Recipe, matched.c.matched, total.label("total"))
+        .join(matched, matched.c.recipe_id == Recipe.id)
+        .where(Recipe.owner_id == owner_id)
+        .order_by(coverage.desc(), matched.c.matched.desc(), Recipe.id)
+        .offset(skip)
+        .limit(limit)
+    ).all()
+
+def _of_owner(statement, recipe_owner_id: int | None):
+    # Favorites and notes are partitioned by recipe owner; naming it lets
+    # Postgres skip every other partition.
+    if recipe_owner_id is None:
+        return statement
+    return statement.where(Favorite.recipe_owner_id == recipe_owner_id)
+
+def get_favorited_ids(db: Session, recipe_ids: List[int], user_id: int, recipe_owner_id: int | None = None) -> set:
+    """The subset of recipe_ids the user has favorited; pass recipe_owner_id when they all share one owner."""
+    if not recipe_ids:
+        return set()
+    return set(db.scalars(_of_owner(
+        select(Favorite.recipe_id).where(Favorite.user_id == user_id, Favorite.recipe_id.in_(recipe_ids)),
+        recipe_owner_id,
+    )))
+
+def get_favorite_stats(db: Session, recipe_ids: List[int], user_id: int, recipe_owner_id: int | None = None) -> dict:
+    """Map recipe id -> (total_favorites, is_favorite) for a page of recipes in two queries."""
+    if not recipe_ids:
+        return {}
+    totals = dict(db.execute(_of_owner(
+        select(Favorite.recipe_id, func.count())
+        .where(Favorite.recipe_id.in_(recipe_ids))
+        .group_by(Favorite.recipe_id),
+        recipe_owner_id,
+    )).all())
+    mine = get_favorited_ids(db, recipe_ids, user_id, recipe_owner_id)
+    return {recipe_id: (totals.get(recipe_id, 0), recipe_id in mine) for recipe_id in recipe_ids}
+
+def get_similar_recipes(db: Session, recipe_id: int, limit: int = 10):
+    """(recipe, score) pairs from the precomputed neighbor table, best first."""
+    return db.execute(
+        select(Recipe, RecipeNeighbor.score)
+        .join(RecipeNeighbor, RecipeNeighbor.neighbor_id == Recipe.id)
+        .where(RecipeNeighbor.recipe_id == recipe_id)
+        .order_by(RecipeNeighbor.score.desc(), Recipe.id)
+        .limit(limit)
+    ).all()
+
+def get_recommended_recipes(db: Session, user_id: int, limit: int = 10):
+    """
+    (recipe, score) pairs for recipes similar to the user's favorites.
+
+    Scores are summed over the user's favorites, and recipes already
+    favorited are left out.
+    """
+    favorited = select(Favorite.recipe_id).where(Favorite.user_id == user_id)
+    scores = (
+        select(RecipeNeighbor.neighbor_id, func.sum(RecipeNeighbor.score).label("score"))
+        .where(RecipeNeighbor.recipe_id.in_(favorited), RecipeNeighbor.neighbor_id.not_in(favorited))
+        .group_by(RecipeNeighbor.neighbor_id)
+        .subquery()
+    )
+    return db.execute(
+        select(Recipe, scores.c.score)
+        .join(scores, scores.c.neighbor_id == Recipe.id)
+        .order_by(scores.c.score.desc(), Recipe.id)
+        .limit(limit)
+    ).all()
+
+def get_trending_recipes(db: Session, window: str, limit: int = 10):
+    """(recipe, rollup row) pairs for a window of the trending rollup, best first."""
+    return db.execute(
+        select(Recipe, TrendingRecipe)
+        .join(TrendingRecipe, TrendingRecipe.recipe_id == Recipe.id)
+        .where(TrendingRecipe.time_window == window)
+        .order_by(TrendingRecipe.rank)
+        .limit(limit)
+    ).all()
+
+def add_favorite(db: Session, recipe: Recipe, user_id: int) -> Favorite:
+    favorite = Favorite(recipe_id=recipe.id, recipe_owner_id=recipe.owner_id, user_id=user_id)
+    db.add(favorite)
+    db.flush()
+    record_event(db, "favorite", favorite.id, "created", user_id, recipe_id=recipe.id)
+    add_favorites_received(db, recipe.owner_id, 1)
+    mark_cards_stale(db, recipe.id)
+    db.commit()
+    invalidate_user_stats(recipe.owner_id)
+    return favorite
 
-def add_recipe_note(db: Session, recipe_id: int, user_id: int, note_in: RecipeNoteCreate):
+def remove_favorite(db: Session, recipe: Recipe, user_id: int) -> Favorite | None:
+    favorite = db.query(Favorite).filter(
+        Favorite.recipe_id == recipe.id,
+        Favorite.recipe_owner_id == recipe.owner_id,
+        Favorite.user_id == user_id
+    ).first()
+    if favorite is None:
+        return None
+    record_event(db, "favorite", favorite.id, "deleted", user_id, recipe_id=recipe.id)
+    record_tombstone(db, user_id, "favorite", recipe.id)
+    add_favorites_received(db, recipe.owner_id, -1)
+    mark_cards_stale(db, recipe.id)
+    db.delete(favorite)
+    db.commit()
+    invalidate_user_stats(recipe.owner_id)
+    return favorite
+
+def add_recipe_note(db: Session, recipe: Recipe, user_id: int, note_in: RecipeNoteCreate):
     note = RecipeNote(
         text=note_in.text,
-        recipe_id=recipe_id,
+        recipe_id=recipe.id,
+        recipe_owner_id=recipe.owner_id,
         user_id=user_id,
         created_at=datetime.now(timezone.utc)
     )
     db.add(note)
+    db.flush()
+    record_event(db, "note", note.id, "created", user_id, recipe_id=recipe.id)
+    mark_cards_stale(db, recipe.id)
     db.commit()
+    invalidate_user_stats(user_id)
     db.refresh(note)
     return note
 
-def get_recipe_notes(db: Session, recipe_id: int):
-    return db.query(RecipeNote).filter(RecipeNote.recipe_id == recipe_id).all()
\ No newline at end of file
+def get_recipe_notes(
+    db: Session,
+    recipe_id: int,
+    owner_id: int,
+    after: int | None = None,
+    limit: int = 50,
+    include: Iterable[str] = (),
+):
+    """
+    A page of the recipe's notes ordered by (created_at, id), after the note
+    with id `after`, or None when the owner has no such recipe.
+
+    The ownership check is the outer join's driving row, so it costs no extra
+    query; `include=["user"]` loads the authors in one more for the whole page.
+    """
+    on = (RecipeNote.recipe_id == Recipe.id) & (RecipeNote.recipe_owner_id == owner_id)
+    if after is not None:
+        cursor = select(RecipeNote.created_at, RecipeNote.id).where(
+            RecipeNote.id == after, RecipeNote.recipe_id == recipe_id, RecipeNote.recipe_owner_id == owner_id
+        )
+        on &= tuple_(RecipeNote.created_at, RecipeNote.id) > cursor.scalar_subquery()
+    statement = (
+        select(Recipe.id, RecipeNote)
+        .outerjoin(RecipeNote, on)
+        .where(Recipe.id == recipe_id, Recipe.owner_id == owner_id)
+        .order_by(RecipeNote.created_at, RecipeNote.id)
+        .limit(limit)
+        .options(*loader_options(NOTE_LOADERS, include))
+    )
+    rows = db.execute(statement).all()
+    if not rows:
+        return None
+    return [note for _, note in rows if note is not None]
@@ -0,0 +1,164 @@
+"""
+Per-user dashboard stats for GET /users/me/stats.
+
+Recipe counts by cuisine and notes written are aggregated on read from
+covering indexes. Ingredient usage and favorites received would mean
+unnesting every ingredient array, or joining every favorite, of a user's
+recipes on each read (several hundred ms at 50k recipes), so those come
+from rollups that the write paths keep current in the same transaction.
+
+Results are also cached per process. Writes that change a user's numbers
+call invalidate_user_stats() after they commit: recipe writes for the
+owner, favorites for the recipe's owner, notes for their author. Other
+workers' caches catch up when the entry expires, after
+USER_STATS_CACHE_SECONDS.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.recipe import Ingredient, Recipe, RecipeNote
+from app.models.stats import UserIngredientCount, UserStats
+
+TOP_INGREDIENTS = 10
+
+
+class StatsCache:
+    """
+    Bounded LRU of computed stats with a TTL.
+
+    invalidate() gives a user a new generation number. A stats computation
+    started before an invalidation is not stored, so a read racing a write
+    cannot put the old numbers back into the cache. Generations live in the
+    same LRU as the values (an invalidated user keeps an empty entry), so
+    at most max_entries users are tracked. A user without an entry has the
+    highest generation evicted so far: a computation that started before
+    its user's entry was evicted is dropped rather than stored.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires, value, generation)
+        self._entries: OrderedDict = OrderedDict()
+        self._last_generation = 0
+        self._evicted_generation = 0
+        self._lock = threading.Lock()
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            _, (_, _, generation) = self._entries.popitem(last=False)
+            self._evicted_generation = max(self._evicted_generation, generation)
+
+    def get(self, key):
+        """(value or None, generation to pass back to set())."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, self._evicted_generation
+            expires, value, generation = entry
+            if expires < time.monotonic():
+                return None, generation
+            self._entries.move_to_end(key)
+            return value, generation
+
+    def set(self, key, value, generation: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry[2] if entry is not None else self._evicted_generation) != generation:
+                return
+            self._store(key, (time.monotonic() + self.ttl, value, generation))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._last_generation += 1
+            # Already expired, so get() misses until a newer computation is stored
+            self._store(key, (0.0, None, self._last_generation))
+
+
+stats_cache = StatsCache(settings.USER_STATS_CACHE_SECONDS)
+
+
+def invalidate_user_stats(*user_ids: int):
+    for user_id in user_ids:
+        stats_cache.invalidate(user_id)
+
+
+def adjust_ingredient_counts(db: Session, user_id: int, deltas: dict):
+    """Add {ingredient_id: delta} to the user's ingredient counts (caller commits)."""
+    # Sorted so concurrent writers lock shared rows in the same order.
+    rows = [
+        {"user_id": user_id, "ingredient_id": ingredient_id, "recipe_count": delta}
+        for ingredient_id, delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    statement = pg_insert(UserIngredientCount).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=["user_id", "ingredient_id"],
+        set_={"recipe_count": UserIngredientCount.recipe_count + statement.excluded.recipe_count},
+    ))
+
+
+def add_favorites_received(db: Session, user_id: int, delta: int):
+    """Add delta to the user's favorites_received (caller commits)."""
+    if not delta:
+        return
+    statement = pg_insert(UserStats).values(user_id=user_id, favorites_received=delta)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"favorites_received": UserStats.favorites_received + statement.excluded.favorites_received},
+    ))
+
+
+def compute_user_stats(db: Session, user_id: int, top_ingredients: int = TOP_INGREDIENTS) -> dict:
+    """The dashboard numbers for one user, in three queries."""
+    by_cuisine = db.execute(
+        select(Recipe.cuisine, func.count().label("count"))
+        .where(Recipe.owner_id == user_id)
+        .group_by(Recipe.cuisine)
+        .order_by(func.count().desc(), Recipe.cuisine)
+    ).all()
+
+    ingredients = db.execute(
+        select(Ingredient.name, UserIngredientCount.recipe_count)
+        .join(Ingredient, Ingredient.id == UserIngredientCount.ingredient_id)
+        .where(UserIngredientCount.user_id == user_id, UserIngredientCount.recipe_count > 0)
+        .order_by(UserIngredientCount.recipe_count.desc(), Ingredient.name)
+        .limit(top_ingredients)
+    ).all()
+
+    favorites_received, notes_written = db.execute(
+        select(
+            func.coalesce(
+                select(UserStats.favorites_received).where(UserStats.user_id == user_id).scalar_subquery(), 0
+            ),
+            select(func.count())
+            .select_from(RecipeNote)
+            .where(RecipeNote.user_id == user_id)
+            .scalar_subquery(),
+        )
+    ).one()
+
+    return {
+        "recipe_count": sum(count for _, count in by_cuisine),
+        "recipes_by_cuisine": [{"cuisine": cuisine, "count": count} for cuisine, count in by_cuisine],
+        "top_ingredients": [{"name": name, "count": count} for name, count in ingredients],
+        "favorites_received": favorites_received,
+        "notes_written": notes_written,
+    }
+
+
+def get_user_stats(db: Session, user_id: int) -> dict:
+    stats, generation = stats_cache.get(user_id)
+    if stats is None:
+        stats = compute_user_stats(db, user_id)
+        stats_cache.set(user_id, stats, generation)
+    return stats
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import delete, insert, literal, select, tuple_
+from sqlalchemy.orm import Session
+from app.models.recipe import Recipe, Favorite, RecipeNote, utc_now
+from app.models.sync import SyncTombstone
+
+# Tokens point this far back from the sync time, so a write whose transaction
+# started before the sync but committed after it is picked up next time.
+# Clients may therefore see a few recent changes twice; applying them is idempotent.
+SYNC_OVERLAP = timedelta(seconds=30)
+TOMBSTONE_RETENTION = timedelta(days=30)
+# Rows of each kind per sync response; larger syncs continue over several pages
+SYNC_PAGE_SIZE = 500
+# Paged in this order within a token, each by (updated_at, id)
+PAGED = ("recipes", "notes", "favorites")
+EPOCH = datetime(1970, 1, 1)
+
+def _micros(at: datetime) -> int:
+    return int(at.replace(tzinfo=timezone.utc).timestamp() * 1_000_000)
+
+def _from_micros(micros: int) -> datetime:
+    if micros < 0:
+        raise ValueError("negative sync token")
+    return datetime.fromtimestamp(micros / 1_000_000, tz=timezone.utc).replace(tzinfo=None)
+
+def encode_token(at: datetime, cursors: Optional[dict] = None) -> str:
+    """
+    `at` alone for a finished sync. A sync with more pages to fetch also
+    carries the (updated_at, id) of the last row sent of each kind.
+    """
+    parts = [_micros(at)]
+    for name in PAGED if cursors is not None else ():
+        updated_at, row_id = cursors[name]
+        parts += [_micros(updated_at), row_id]
+    return ".".join(map(str, parts))
+
+def decode_token(token: str) -> tuple[datetime, Optional[dict]]:
+    """Inverse of encode_token; raises ValueError for anything else."""
+    parts = [int(part) for part in token.split(".")]
+    if len(parts) == 1:
+        return _from_micros(parts[0]), None
+    if len(parts) != 1 + 2 * len(PAGED):
+        raise ValueError("malformed sync token")
+    cursors = {
+        name: (_from_micros(parts[1 + 2 * i]), parts[2 + 2 * i])
+        for i, name in enumerate(PAGED)
+    }
+    return _from_micros(parts[0]), cursors
+
+def token_expired(since: datetime) -> bool:
+    # Older tokens may have missed tombstones that were already pruned
+    return since < datetime.utcnow() - TOMBSTONE_RETENTION
+
+def record_tombstone(db: Session, user_id: int, entity: str, entity_id: int):
+    db.add(SyncTombstone(user_id=user_id, entity=entity, entity_id=entity_id))
+
+def record_recipe_tombstones(db: Session, owner_id: int, recipe_ids: List[int]):
+    """
+    Tombstone the owner's recipes about to be deleted, plus the notes and
+    favorites that go with them, for every user who had them (set-based,
+    caller commits).
+    """
+    columns = ["user_id", "entity", "entity_id"]
+    db.execute(insert(SyncTombstone).from_select(columns, select(
+        Recipe.owner_id, literal("recipe"), Recipe.id
+    ).where(Recipe.owner_id == owner_id, Recipe.id.in_(recipe_ids))))
+    db.execute(insert(SyncTombstone).from_select(columns, select(
+        RecipeNote.user_id, literal("note"), RecipeNote.id
+    ).where(RecipeNote.recipe_owner_id == owner_id, RecipeNote.recipe_id.in_(recipe_ids))))
+    db.execute(insert(SyncTombstone).from_select(columns, select(
+        Favorite.user_id, literal("favorite"), Favorite.recipe_id
+    ).where(Favorite.recipe_owner_id == owner_id, Favorite.recipe_id.in_(recipe_ids))))
+
+def _page(db: Session, model, owner_column, cursor: tuple, limit: int) -> list:
+    """Up to limit + 1 of the user's rows after `cursor`, by (updated_at, id)."""
+    updated_at, row_id = cursor
+    return db.scalars(
+        select(model)
+        .where(
+            owner_column,
+            # The plain bound lets the (user, updated_at) index do the seeking
+            model.updated_at >= updated_at,
+            tuple_(model.updated_at, model.id) > (updated_at, row_id),
+        )
+        .order_by(model.updated_at, model.id)
+        .limit(limit + 1)
+    ).all()
+
+def get_changes(
+    db: Session,
+    user_id: int,
+    since: Optional[datetime] = None,
+    cursors: Optional[dict] = None,
+    limit: int = SYNC_PAGE_SIZE,
+) -> dict:
+    """
+    One page of what the user's client must apply to catch up from `since`
+    (a full snapshot when since is None), plus the token for the next call.
+
+    Each kind of row is paged by (updated_at, id), at most `limit` per call.
+    While `has_more` is set, next_token continues the same sync from
+    `cursors` (and `since` is then the point the finished sync will resume
+    from); once it is clear, next_token is the point to sync from next time.
+    A row that changes while the pages are fetched may be sent twice, like
+    rows inside SYNC_OVERLAP.
+    """
+    first_page = cursors is None
+    if first_page:
+        start = since if since is not None else EPOCH
+        cursors = {name: (start, 0) for name in PAGED}
+        # Deletes while the pages are fetched come with the next sync
+        resume_at = db.scalar(select(utc_now())) - SYNC_OVERLAP
+    else:
+        cursors = dict(cursors)
+        resume_at = since
+
+    pages = {
+        "recipes": _page(db, Recipe, Recipe.owner_id == user_id, cursors["recipes"], limit),
+        "notes": _page(db, RecipeNote, RecipeNote.user_id == user_id, cursors["notes"], limit),
+        "favorites": _page(db, Favorite, Favorite.user_id == user_id, cursors["favorites"], limit),
+    }
+    has_more = any(len(rows) > limit for rows in pages.values())
+    for name, rows in pages.items():
+        del rows[limit:]
+        if rows:
+            cursors[name] = (rows[-1].updated_at, rows[-1].id)
+
+    deleted = {"recipes": [], "notes": [], "favorites": []}
+    # Tombstones are sent with the first page of an incremental sync
+    if first_page and since is not None:
+        tombstones = db.execute(
+            select(SyncTombstone.entity, SyncTombstone.entity_id)
+            .where(SyncTombstone.user_id == user_id, SyncTombstone.deleted_at > since)
+            .order_by(SyncTombstone.deleted_at)
+        ).all()
+        for entity, entity_id in tombstones:
+            deleted[f"{entity}s"].append(entity_id)
+
+    favorited = list(dict.fromkeys(favorite.recipe_id for favorite in pages["favorites"]))
+    if deleted["favorites"]:
+        # Unfavorited and then favorited again: only the current state counts
+        still_favorited = set(db.scalars(select(Favorite.recipe_id).where(
+            Favorite.user_id == user_id, Favorite.recipe_id.in_(deleted["favorites"])
+        )))
+        deleted["favorites"] = [r for r in dict.fromkeys(deleted["favorites"]) if r not in still_favorited]
+
+    return {
+        "recipes": pages["recipes"],
+        "notes": pages["notes"],
+        "favorites": favorited,
+        "deleted": deleted,
+        "has_more": has_more,
+        "next_token": encode_token(resume_at, cursors if has_more else None),
+    }
+
+def prune_tombstones(db: Session, batch_size: int = 10_000) -> int:
+    """Delete tombstones past retention, a batch at a time."""
+    cutoff = datetime.utcnow() - TOMBSTONE_RETENTION
+    deleted = 0
+    while True:
+        batch = select(SyncTombstone.id).where(SyncTombstone.deleted_at < cutoff).limit(batch_size)
+        count = db.execute(delete(SyncTombstone).where(SyncTombstone.id.in_(batch))).rowcount
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
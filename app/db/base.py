@@ -4,7 +4,14 @@ from app.models.base_class import Base
 def register_models():
     # Import all models here to register them with Base.metadata
     from app.models.user import User
-    from app.models.recipe import Recipe, Favorite, RecipeNote
+    from app.models.recipe import Recipe, Favorite, RecipeNote, Ingredient, RecipeIngredient
+    from app.models.recommendation import RecipeNeighbor, RecommendationState
+    from app.models.trending import TrendingRecipe
+    from app.models.event import OutboxEvent
+    from app.models.sync import SyncTombstone
+    from app.models.stats import UserStats, UserIngredientCount
+    from app.models.archive import RecipeArchive
+    from app.models.card import RecipeCard, StaleRecipeCard
     
     return Base.metadata
 
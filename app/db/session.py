@@ -5,7 +5,31 @@ from app.core.config import settings
 engine = create_engine(
     str(settings.SQLALCHEMY_DATABASE_URL),  # convert to string hereURL,
     echo=True,
-    future=True
+    future=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    # Without it, connecting to an unreachable host blocks for minutes
+    connect_args={"connect_timeout": settings.DB_CONNECT_TIMEOUT},
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Most connections this process will hold at once
+POOL_CAPACITY = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+def pool_headroom() -> int:
+    """Connections a request can still check out without waiting."""
+    return POOL_CAPACITY - engine.pool.checkedout()
+
+def warm_up_pool(connections: int = settings.DB_POOL_WARMUP) -> int:
+    """Open up to `connections` pooled connections now, instead of on the first requests."""
+    # Held together, so the pool has to open a new one each time
+    held = []
+    try:
+        for _ in range(min(connections, settings.DB_POOL_SIZE)):
+            held.append(engine.connect())
+    finally:
+        for connection in held:
+            connection.close()
+    return len(held)
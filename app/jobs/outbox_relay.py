@@ -0,0 +1,117 @@
+"""
+Relay that publishes outbox events in batches.
+
+Writers only insert into `outbox_events` inside their own transaction. The
+relay picks up committed, unpublished events in batches, hands them to a
+publisher, and stamps them with a feed position (`seq`) that GET /events
+pages through. Relays are serialized with an advisory lock, so `seq` grows
+in the order events became visible and a consumer holding a cursor never
+skips an event that committed late. Positions come from a database
+sequence, so they keep growing after prune_published() has emptied the
+table (a failed batch can leave a gap). Delivery is at-least-once: if
+publishing fails the batch is rolled back and retried on the next run.
+
+    python -m app.jobs.outbox_relay                   # drain once
+    python -m app.jobs.outbox_relay --every 1         # keep relaying
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from app.models.event import FEED_SEQUENCE, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+RETAIN_DAYS = 7
+# Arbitrary constant so two relays never interleave their sequence numbers.
+ADVISORY_LOCK_ID = 310_031
+
+def log_events(events):
+    """Default publisher. Swap in a broker/webhook client to push events out."""
+    for event in events:
+        logger.debug("outbox %s %s %s", event.aggregate, event.aggregate_id, event.action)
+
+def relay_batch(db: Session, publish=log_events, batch_size: int = BATCH_SIZE) -> int:
+    """Publish one batch of pending events and return how many were published."""
+    db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+    events = db.scalars(
+        select(OutboxEvent)
+        .where(OutboxEvent.seq.is_(None))
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+    ).all()
+    if not events:
+        db.commit()
+        return 0
+    publish(events)
+    # Sorted: the rows of one SELECT are not guaranteed to draw values in order
+    seqs = sorted(db.scalars(
+        select(FEED_SEQUENCE.next_value()).select_from(func.generate_series(1, len(events)))
+    ))
+    now = datetime.utcnow()
+    for event, seq in zip(events, seqs):
+        event.seq = seq
+        event.published_at = now
+    db.commit()
+    return len(events)
+
+def relay_pending(db: Session, publish=log_events, batch_size: int = BATCH_SIZE) -> int:
+    """Publish batches until nothing is pending."""
+    published = 0
+    while True:
+        count = relay_batch(db, publish, batch_size)
+        published += count
+        if count < batch_size:
+            return published
+
+def prune_published(db: Session, retain_days: int = RETAIN_DAYS, batch_size: int = 10_000) -> int:
+    """Delete published events older than the retention window, a batch at a time."""
+    cutoff = datetime.utcnow() - timedelta(days=retain_days)
+    deleted = 0
+    while True:
+        batch = select(OutboxEvent.id).where(
+            OutboxEvent.published_at < cutoff
+        ).order_by(OutboxEvent.id).limit(batch_size)
+        count = db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(batch))).rowcount
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish pending outbox events.")
+    parser.add_argument("--every", type=float, default=0, metavar="SECONDS",
+                        help="keep running and relay on this interval")
+    parser.add_argument("--retain-days", type=int, default=RETAIN_DAYS,
+                        help="delete published events older than this")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+    logging.basicConfig(level=logging.INFO)
+    last_prune = 0.0
+    while True:
+        db = SessionLocal()
+        try:
+            published = relay_pending(db)
+            if published:
+                logger.info("outbox: published %d events", published)
+            if time.monotonic() - last_prune > 3600:
+                logger.info("outbox: pruned %d events", prune_published(db, args.retain_days))
+                last_prune = time.monotonic()
+        except Exception:
+            if not args.every:
+                raise
+            logger.exception("outbox relay failed")
+        finally:
+            db.close()
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
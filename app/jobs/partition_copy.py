@@ -0,0 +1,114 @@
+"""
+Online copy of recipes, favorites and recipe_notes into the hash-partitioned
+tables created by migration c4ff7bfd1536, while the app keeps serving:
+
+    alembic upgrade c4ff7bfd1536                 # partitioned copies + mirror triggers
+    python -m app.jobs.partition_copy            # copy existing rows (resumable)
+    python -m app.jobs.partition_copy --verify   # compare row counts
+    alembic upgrade head                         # swap the tables under a short lock
+
+The old app keeps running until the swap; the README has the full deploy
+sequence. The swap refuses to run while this is far behind.
+
+Since that migration, triggers mirror every write into the copies, so only
+rows that existed before it need copying. They are copied in id order,
+`batch_size` rows per transaction. Each batch share-locks its source rows:
+an update or delete of a row being copied waits for the batch to commit
+and is then mirrored on top of it, and a batch never overwrites a row a
+trigger already wrote (ON CONFLICT DO NOTHING). Progress is stored in
+partition_copy_progress, so an interrupted run resumes where it stopped.
+"""
+import argparse
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5_000
+# Arbitrary constant so two copies never race on the progress rows.
+ADVISORY_LOCK_ID = 400_040
+
+# Recipes first, so favorites and notes can look up their recipe's owner
+COPIED_ROWS = {
+    "recipes": "SELECT source.* FROM recipes source",
+    "favorites": "SELECT source.*, recipes.owner_id FROM favorites source "
+                 "JOIN recipes ON recipes.id = source.recipe_id",
+    "recipe_notes": "SELECT source.*, recipes.owner_id FROM recipe_notes source "
+                    "JOIN recipes ON recipes.id = source.recipe_id",
+}
+
+def copy_batch(db: Session, table: str, batch_size: int = BATCH_SIZE) -> int:
+    """Copy the next batch of `table` and return how many source rows it covered."""
+    db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+    after = db.scalar(
+        text("SELECT last_id FROM partition_copy_progress WHERE table_name = :table"), {"table": table}
+    ) or 0
+    upto, count = db.execute(text(f"""
+        SELECT max(id), count(*) FROM (
+            SELECT id FROM {table} WHERE id > :after ORDER BY id LIMIT :limit
+        ) batch
+    """), {"after": after, "limit": batch_size}).one()
+    if not count:
+        db.commit()
+        return 0
+    db.execute(text(f"""
+        INSERT INTO {table}_partitioned {COPIED_ROWS[table]}
+        WHERE source.id > :after AND source.id <= :upto
+        FOR SHARE OF source
+        ON CONFLICT DO NOTHING
+    """), {"after": after, "upto": upto})
+    db.execute(text("""
+        INSERT INTO partition_copy_progress (table_name, last_id) VALUES (:table, :upto)
+        ON CONFLICT (table_name) DO UPDATE SET last_id = excluded.last_id
+    """), {"table": table, "upto": upto})
+    db.commit()
+    return count
+
+def copy_table(db: Session, table: str, batch_size: int = BATCH_SIZE, pause: float = 0) -> int:
+    """Copy batches of `table` until it is done, sleeping `pause` seconds between them."""
+    copied = 0
+    while True:
+        count = copy_batch(db, table, batch_size)
+        copied += count
+        if count < batch_size:
+            return copied
+        if pause:
+            time.sleep(pause)
+
+def compare_counts(db: Session) -> dict:
+    """Map table -> (rows in the live table, rows in its partitioned copy)."""
+    return {
+        table: db.execute(text(
+            f"SELECT (SELECT count(*) FROM {table}), (SELECT count(*) FROM {table}_partitioned)"
+        )).one()
+        for table in COPIED_ROWS
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy rows into the partitioned tables.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0, metavar="SECONDS",
+                        help="sleep between batches to leave the database headroom")
+    parser.add_argument("--verify", action="store_true", help="only compare row counts")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        if args.verify:
+            for table, (live, copied) in compare_counts(db).items():
+                logger.info("%s: %d live rows, %d copied%s", table, live, copied, "" if live == copied else "  MISMATCH")
+            return
+        for table in COPIED_ROWS:
+            started = time.monotonic()
+            copied = copy_table(db, table, args.batch_size, args.pause)
+            logger.info("%s: copied %d rows in %.1fs", table, copied, time.monotonic() - started)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Delete sync tombstones older than crud_sync.TOMBSTONE_RETENTION.
+
+Clients whose token predates the retention window get 410 from
+GET /recipes/sync and fall back to a full sync, so nothing is lost.
+
+    python -m app.jobs.prune_tombstones
+"""
+import logging
+
+from app.crud.crud_sync import prune_tombstones
+
+logger = logging.getLogger(__name__)
+
+def main():
+    from app.db.session import SessionLocal
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        logger.info("sync_tombstones: pruned %d rows", prune_tombstones(db))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
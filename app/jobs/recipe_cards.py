@@ -0,0 +1,128 @@
+"""
+Worker that renders the `recipe_cards` queued by crud_card.mark_cards_stale.
+
+Each batch dequeues up to BATCH_SIZE recipes and renders their cards with
+one INSERT ... SELECT in the same transaction, so a failed batch stays
+queued. Queue rows are claimed with SKIP LOCKED, so several workers can run
+side by side, and a write that re-queues a recipe while its card is being
+rendered gets it rendered again on the next batch.
+
+    python -m app.jobs.recipe_cards                # drain once
+    python -m app.jobs.recipe_cards --every 1      # keep rendering
+    python -m app.jobs.recipe_cards --full         # queue every recipe first
+"""
+import argparse
+import logging
+import time
+
+from sqlalchemy import Integer, case, cast, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.card import RecipeCard, StaleRecipeCard
+from app.models.recipe import Favorite, Recipe, RecipeNote, utc_now
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+STEPS_EXCERPT_LENGTH = 160
+
+def _steps_excerpt():
+    # Cut at the last whole word that fits and mark the cut
+    cut = func.regexp_replace(func.left(Recipe.steps, STEPS_EXCERPT_LENGTH), r"\s+\S*$", "")
+    return case(
+        (func.char_length(Recipe.steps) <= STEPS_EXCERPT_LENGTH, Recipe.steps),
+        else_=cut + literal("..."),
+    )
+
+def card_rows():
+    """(recipe_id, owner_id, card) for every recipe; filter it to the ones to render."""
+    favorite_count = select(func.count()).where(
+        Favorite.recipe_id == Recipe.id, Favorite.recipe_owner_id == Recipe.owner_id
+    ).scalar_subquery()
+    note_count = select(func.count()).where(
+        RecipeNote.recipe_id == Recipe.id, RecipeNote.recipe_owner_id == Recipe.owner_id
+    ).scalar_subquery()
+    card = func.jsonb_build_object(
+        "id", Recipe.id,
+        "title", Recipe.title,
+        "cuisine", Recipe.cuisine,
+        "ingredient_count", func.coalesce(func.cardinality(Recipe.ingredients), 0),
+        "steps_excerpt", _steps_excerpt(),
+        "favorite_count", cast(favorite_count, Integer),
+        "note_count", cast(note_count, Integer),
+        "updated_at", Recipe.updated_at,
+    )
+    return select(Recipe.id, Recipe.owner_id, card)
+
+def render_batch(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """Render one batch of queued cards and return how many recipes were dequeued."""
+    claimed = (
+        select(StaleRecipeCard.recipe_id)
+        .order_by(StaleRecipeCard.recipe_id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    recipe_ids = db.scalars(
+        delete(StaleRecipeCard).where(StaleRecipeCard.recipe_id.in_(claimed)).returning(StaleRecipeCard.recipe_id)
+    ).all()
+    if recipe_ids:
+        statement = pg_insert(RecipeCard).from_select(
+            ["recipe_id", "owner_id", "card"], card_rows().where(Recipe.id.in_(recipe_ids))
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["recipe_id"],
+            set_={"owner_id": statement.excluded.owner_id, "card": statement.excluded.card, "rendered_at": utc_now()},
+        ))
+    db.commit()
+    return len(recipe_ids)
+
+def render_pending(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """Render batches until the queue is empty."""
+    rendered = 0
+    while True:
+        count = render_batch(db, batch_size)
+        rendered += count
+        if count < batch_size:
+            return rendered
+
+def queue_all(db: Session) -> int:
+    """Queue every recipe, e.g. after changing what a card contains."""
+    statement = pg_insert(StaleRecipeCard).from_select(["recipe_id"], select(Recipe.id))
+    queued = db.execute(statement.on_conflict_do_nothing(index_elements=["recipe_id"])).rowcount
+    db.commit()
+    return queued
+
+def main():
+    parser = argparse.ArgumentParser(description="Render queued recipe cards.")
+    parser.add_argument("--every", type=float, default=0, metavar="SECONDS",
+                        help="keep running and render on this interval")
+    parser.add_argument("--full", action="store_true", help="queue every recipe before rendering")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+    logging.basicConfig(level=logging.INFO)
+    if args.full:
+        db = SessionLocal()
+        try:
+            logger.info("recipe_cards: queued %d recipes", queue_all(db))
+        finally:
+            db.close()
+    while True:
+        db = SessionLocal()
+        try:
+            rendered = render_pending(db)
+            if rendered:
+                logger.info("recipe_cards: rendered %d cards", rendered)
+        except Exception:
+            if not args.every:
+                raise
+            logger.exception("recipe card rendering failed")
+        finally:
+            db.close()
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Offline job that maintains the `recipe_neighbors` table from favorites.
+
+Recipes are "similar" when the same users favorite them: the score is the
+cosine similarity of two recipes' favorite vectors, i.e. the item-item
+co-occurrence count C = X^T X normalized by sqrt(n_i * n_j), where X is the
+binary user x recipe matrix. Only the top K neighbors per recipe are stored,
+so serving a request is a single primary-key range lookup.
+
+    python -m app.jobs.recommendations            # fold in new favorites
+    python -m app.jobs.recommendations --full     # rebuild from scratch
+
+Incremental runs follow the favorite events in the outbox feed, so they
+only see what app.jobs.outbox_relay has published. Feed positions (seq)
+grow in commit order, unlike favorites.id, which is drawn before commit:
+a favorite whose transaction commits after a later one is still picked up.
+For every user with a new or removed favorite, the neighbor lists of the
+recipes they favorite, and of the recipe they unfavorited, are recomputed.
+The small score drift this leaves on recipes outside that set is only
+corrected by a full rebuild, so schedule one periodically (e.g. nightly)
+next to the frequent incremental runs. If events the job never read have
+been pruned from the feed, the next run is a full rebuild.
+
+Favorites are never loaded all at once. The recipes to recompute are
+split into runs of consecutive ids, sized so that the favorites of their
+users and the product block built from them fit the memory budget, and
+each run is read and ranked before the next one.
+"""
+import argparse
+import logging
+from datetime import datetime, timezone
+from itertools import chain
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import BigInteger, delete, func, insert, select, text, union
+from sqlalchemy.orm import Session
+
+from app.models.event import OutboxEvent
+from app.models.recipe import Favorite
+from app.models.recommendation import RecipeNeighbor, RecommendationState
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 20
+MEMORY_BUDGET_MB = 512
+# Rough peak cost of one non-zero of a C = X^T X block: scipy's int64 index
+# and float data for the product plus the arrays used to rank it.
+BYTES_PER_PRODUCT_NNZ = 48
+# Rough peak cost of one favorite held for a block: the fetched id arrays
+# (twice while batches are concatenated), the index arrays from np.unique,
+# and X and its transpose.
+BYTES_PER_FAVORITE = 100
+FETCH_BATCH_SIZE = 10_000
+WRITE_BATCH_SIZE = 10_000
+# Arbitrary constant so two refreshes never interleave their writes.
+ADVISORY_LOCK_ID = 270_027
+
+def _fetch_pairs(db: Session, statement) -> tuple[np.ndarray, np.ndarray]:
+    """Stream two-column integer rows, e.g. (user_id, recipe_id), into two int64 arrays in bounded batches."""
+    result = db.execute(statement.execution_options(stream_results=True, yield_per=FETCH_BATCH_SIZE))
+    # Iterating each row rather than handing numpy the Row objects, which it
+    # would probe attribute by attribute for an array interface.
+    chunks = [
+        np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2)
+        for rows in result.partitions()
+    ]
+    if not chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.concatenate(chunks)
+    return pairs[:, 0], pairs[:, 1]
+
+def _row_blocks(cost: np.ndarray, budget: int):
+    """Split rows into contiguous [start, end) blocks whose summed cost fits the budget."""
+    cumulative = np.cumsum(cost)
+    start = 0
+    while start < len(cost):
+        base = cumulative[start - 1] if start else 0
+        end = int(np.searchsorted(cumulative, base + budget, side="right"))
+        # A single row over budget still has to be computed on its own.
+        end = max(end, start + 1)
+        yield start, end
+        start = end
+
+def _top_k(block: sparse.csr_matrix, self_cols: np.ndarray, row_counts: np.ndarray, col_counts: np.ndarray, k: int):
+    """
+    Cosine-normalize a block of C and keep the k best columns of each row.
+
+    `self_cols[i]` is the column of block row i's own recipe (dropped), and
+    `row_counts`/`col_counts` are the favorite counts of rows and columns.
+    """
+    block = block.tocoo()
+    rows, cols, co = block.row.astype(np.int64), block.col.astype(np.int64), block.data
+    not_self = cols != self_cols[rows]
+    rows, cols, co = rows[not_self], cols[not_self], co[not_self]
+    scores = co / np.sqrt(row_counts[rows] * col_counts[cols])
+    # Group by row, best score first, ties broken by column for stable output.
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+    keep = rank < k
+    return rows[keep], cols[keep], scores[keep]
+
+def compute_neighbors(
+    user_ids: np.ndarray,
+    recipe_ids: np.ndarray,
+    rows_for: np.ndarray | None = None,
+    item_counts: dict | None = None,
+    k: int = TOP_K,
+    memory_budget_mb: int = MEMORY_BUDGET_MB,
+):
+    """
+    Yield (recipe_id, neighbor_id, score) arrays, one triple per memory-bounded block.
+
+    `user_ids`/`recipe_ids` are parallel arrays with one entry per favorite.
+    `rows_for` limits which recipes get neighbor lists (default: all of them).
+    `item_counts` is a pair of arrays (sorted recipe ids, total favorites)
+    for when the arrays only hold a subset of the favorites table, so the
+    normalization stays global.
+
+    `memory_budget_mb` bounds the product blocks; the caller keeps the input
+    itself small, see refresh_neighbors.
+    """
+    if len(user_ids) == 0:
+        return
+    recipe_index, recipe_cols = np.unique(recipe_ids, return_inverse=True)
+    _, user_rows = np.unique(user_ids, return_inverse=True)
+    X = sparse.csr_matrix(
+        (np.ones(len(user_rows), dtype=np.float32), (user_rows, recipe_cols)),
+        shape=(user_rows.max() + 1, len(recipe_index)),
+    )
+    # favorites has no unique constraint; a duplicate row must not count twice.
+    X.sum_duplicates()
+    X.data[:] = 1
+    Xt = X.T.tocsr()
+
+    if item_counts is None:
+        counts = np.asarray(Xt.getnnz(axis=1), dtype=np.float64)
+    else:
+        known_ids, known_counts = item_counts
+        counts = np.zeros(len(recipe_index), dtype=np.float64)
+        if len(known_ids):
+            at = np.minimum(np.searchsorted(known_ids, recipe_index), len(known_ids) - 1)
+            found = known_ids[at] == recipe_index
+            counts[found] = known_counts[at[found]]
+        counts = np.maximum(counts, Xt.getnnz(axis=1))
+
+    if rows_for is None:
+        rows = np.arange(len(recipe_index))
+    else:
+        rows = np.flatnonzero(np.isin(recipe_index, rows_for))
+    Xt = Xt[rows]
+
+    # Non-zeros produced for a recipe row are bounded by the summed degree of
+    # the users who favorited it, which sizes each block before it is built.
+    user_degree = np.asarray(X.getnnz(axis=1), dtype=np.int64)
+    cost = Xt @ user_degree
+    budget = max(1, memory_budget_mb * 2**20 // BYTES_PER_PRODUCT_NNZ)
+    for start, end in _row_blocks(cost, budget):
+        block_rows = rows[start:end]
+        r, c, scores = _top_k(Xt[start:end] @ X, block_rows, counts[block_rows], counts, k)
+        yield recipe_index[block_rows[r]], recipe_index[c], scores
+
+def _recipe_costs(db: Session, recipes=None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the favorited recipe ids (sorted) and, for each, the summed degree
+    of the users who favorited it.
+
+    That sum bounds both the favorites read for the recipe and the non-zeros
+    of its product row. `recipes` optionally restricts the ids (a select).
+    """
+    degree = select(Favorite.user_id, func.count().label("degree")).group_by(Favorite.user_id)
+    if recipes is not None:
+        degree = degree.where(Favorite.user_id.in_(select(Favorite.user_id).where(Favorite.recipe_id.in_(recipes))))
+    degree = degree.subquery()
+    costs = (
+        select(Favorite.recipe_id, func.sum(degree.c.degree).cast(BigInteger))
+        .join(degree, degree.c.user_id == Favorite.user_id)
+        .group_by(Favorite.recipe_id)
+        .order_by(Favorite.recipe_id)
+    )
+    if recipes is not None:
+        costs = costs.where(Favorite.recipe_id.in_(recipes))
+    return _fetch_pairs(db, costs)
+
+def _neighbor_blocks(db: Session, recipes=None, k: int = TOP_K, memory_budget_mb: int = MEMORY_BUDGET_MB):
+    """
+    Yield compute_neighbors output for `recipes` (a select; default all), one
+    run of consecutive recipe ids at a time.
+
+    Each run reads only the favorites of users who favorited one of its
+    recipes, plus the global favorite counts of the recipes they touch, so
+    the job holds one run's worth of favorites at a time instead of the
+    whole table. A recipe whose users alone exceed the budget is still
+    computed on its own. Users who favorite recipes in several runs are
+    read once per run.
+    """
+    recipe_ids, cost = _recipe_costs(db, recipes)
+    budget = max(1, memory_budget_mb * 2**20 // (BYTES_PER_FAVORITE + BYTES_PER_PRODUCT_NNZ))
+    for start, end in _row_blocks(cost, budget):
+        rows_for = recipe_ids[start:end]
+        in_run = [Favorite.recipe_id.between(int(rows_for[0]), int(rows_for[-1]))]
+        if recipes is not None:
+            in_run.append(Favorite.recipe_id.in_(recipes))
+        run_users = select(Favorite.user_id).where(*in_run)
+        user_ids, neighbor_ids = _fetch_pairs(
+            db, select(Favorite.user_id, Favorite.recipe_id).where(Favorite.user_id.in_(run_users))
+        )
+        item_counts = _fetch_pairs(db, (
+            select(Favorite.recipe_id, func.count(func.distinct(Favorite.user_id)))
+            .where(Favorite.recipe_id.in_(select(Favorite.recipe_id).where(Favorite.user_id.in_(run_users))))
+            .group_by(Favorite.recipe_id)
+            .order_by(Favorite.recipe_id)
+        ))
+        yield from compute_neighbors(
+            user_ids, neighbor_ids, rows_for=rows_for, item_counts=item_counts,
+            k=k, memory_budget_mb=memory_budget_mb,
+        )
+
+def _write_neighbors(db: Session, blocks) -> int:
+    written = 0
+    for recipe_ids, neighbor_ids, scores in blocks:
+        for i in range(0, len(recipe_ids), WRITE_BATCH_SIZE):
+            rows = [
+                {"recipe_id": int(r), "neighbor_id": int(n), "score": float(s)}
+                for r, n, s in zip(
+                    recipe_ids[i:i + WRITE_BATCH_SIZE],
+                    neighbor_ids[i:i + WRITE_BATCH_SIZE],
+                    scores[i:i + WRITE_BATCH_SIZE],
+                )
+            ]
+            db.execute(insert(RecipeNeighbor), rows)
+            written += len(rows)
+    return written
+
+def refresh_neighbors(db: Session, full: bool = False, k: int = TOP_K, memory_budget_mb: int = MEMORY_BUDGET_MB) -> int:
+    """
+    Bring recipe_neighbors up to date and return the number of rows written.
+
+    Everything happens in one transaction, so readers keep seeing the previous
+    neighbor lists until the refresh commits. Apart from two int64 arrays
+    with one entry per recipe to recompute and one batch of FETCH_BATCH_SIZE
+    rows being read, memory stays within `memory_budget_mb`; see
+    _neighbor_blocks.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+    state = db.get(RecommendationState, 1)
+    if state is None:
+        state = RecommendationState(id=1)
+        db.add(state)
+    last_seq = state.last_event_seq
+    max_seq, min_seq = db.execute(select(func.max(OutboxEvent.seq), func.min(OutboxEvent.seq))).one()
+    max_seq = max_seq or 0
+    # Events after last_seq were pruned unread (or a relay batch left a gap)
+    missed = last_seq is not None and min_seq is not None and min_seq > last_seq + 1
+    if full or last_seq is None or missed:
+        db.execute(delete(RecipeNeighbor))
+        written = _write_neighbors(db, _neighbor_blocks(db, k=k, memory_budget_mb=memory_budget_mb))
+    elif max_seq > last_seq:
+        # Users whose favorites changed, and every recipe they favorite plus
+        # any they unfavorited: those rows change.
+        events = select(OutboxEvent.user_id, OutboxEvent.payload["recipe_id"].as_integer().label("recipe_id")).where(
+            OutboxEvent.aggregate == "favorite", OutboxEvent.seq > last_seq, OutboxEvent.seq <= max_seq
+        ).subquery()
+        changed_users = select(events.c.user_id)
+        affected = union(
+            select(Favorite.recipe_id).where(Favorite.user_id.in_(changed_users)),
+            select(events.c.recipe_id),
+        )
+        db.execute(delete(RecipeNeighbor).where(RecipeNeighbor.recipe_id.in_(affected)))
+        written = _write_neighbors(db, _neighbor_blocks(db, affected, k=k, memory_budget_mb=memory_budget_mb))
+    else:
+        written = 0
+    state.last_event_seq = max_seq
+    state.refreshed_at = datetime.now(timezone.utc)
+    db.commit()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the recipe_neighbors table from favorites.")
+    parser.add_argument("--full", action="store_true", help="rebuild every neighbor list from scratch")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--memory-budget-mb", type=int, default=MEMORY_BUDGET_MB,
+                        help="memory cap for the favorites read and similarity blocks at any one time")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        written = refresh_neighbors(db, full=args.full, k=args.top_k, memory_budget_mb=args.memory_budget_mb)
+        logger.info("recipe_neighbors refreshed: %d rows written", written)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Scheduled job that rebuilds the `trending_recipes` rollup.
+
+For each time window it ranks the recipes with the most favorites created
+inside the window and keeps the top TRENDING_SIZE, so GET /recipes/trending
+reads a handful of rows by primary key no matter how large favorites grows.
+The refresh only scans favorites newer than the longest window (through the
+created_at index) and swaps the rollup in one transaction, so readers keep
+seeing the previous ranking until it commits.
+
+    python -m app.jobs.trending                # refresh once
+    python -m app.jobs.trending --every 300    # refresh every 5 minutes
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from app.models.recipe import Favorite
+from app.models.trending import TrendingRecipe
+
+logger = logging.getLogger(__name__)
+
+TRENDING_WINDOWS = {
+    "day": timedelta(days=1),
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+}
+TRENDING_SIZE = 100
+# Arbitrary constant so two refreshes never interleave their writes.
+ADVISORY_LOCK_ID = 280_028
+
+def refresh_trending(db: Session, now: datetime | None = None) -> int:
+    """Rebuild every window of the rollup and return the number of rows written."""
+    now = now or datetime.utcnow()
+    db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+    db.execute(delete(TrendingRecipe))
+    written = 0
+    for window, length in TRENDING_WINDOWS.items():
+        top = (
+            select(Favorite.recipe_id, func.count().label("window_favorites"))
+            .where(Favorite.created_at >= now - length)
+            .group_by(Favorite.recipe_id)
+            .order_by(func.count().desc(), Favorite.recipe_id)
+            .limit(TRENDING_SIZE)
+            .subquery()
+        )
+        all_time = (
+            select(func.count())
+            .select_from(Favorite)
+            .where(Favorite.recipe_id == top.c.recipe_id)
+            .scalar_subquery()
+        )
+        result = db.execute(
+            insert(TrendingRecipe).from_select(
+                ["time_window", "rank", "recipe_id", "window_favorites", "total_favorites", "refreshed_at"],
+                select(
+                    literal(window),
+                    func.row_number().over(order_by=(top.c.window_favorites.desc(), top.c.recipe_id)),
+                    top.c.recipe_id,
+                    top.c.window_favorites,
+                    all_time,
+                    literal(now),
+                ),
+            )
+        )
+        written += result.rowcount
+    db.commit()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the trending_recipes rollup.")
+    parser.add_argument("--every", type=int, default=0, metavar="SECONDS",
+                        help="keep running and refresh on this interval")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        db = SessionLocal()
+        try:
+            logger.info("trending_recipes refreshed: %d rows written", refresh_trending(db))
+        except Exception:
+            if not args.every:
+                raise
+            logger.exception("trending refresh failed")
+        finally:
+            db.close()
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
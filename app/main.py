@@ -1,18 +1,60 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, recipes, users
+from app.api import auth, events, health, metrics, profiles, recipes, users
+from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.profiling import ProfileStore, ProfilingMiddleware, instrument_routes
+from app.core.rate_limit import AdmissionControlMiddleware, build_admission_control
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The server starts accepting requests only once this returns
+    await run_in_threadpool(health.warm_up, app)
+    yield
 
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Khana Kahani API",
-        description="Recipe Management System API"
+        description="Recipe Management System API",
+        lifespan=lifespan,
     )
 
+    # Shed excess load before it reaches bcrypt or the database
+    if settings.RATE_LIMIT_ENABLED:
+        app.state.admission = build_admission_control(settings)
+        app.add_middleware(AdmissionControlMiddleware, control=app.state.admission)
+
+    # Negotiated brotli/gzip for anything worth compressing
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.GZIP_LEVEL,
+        brotli_quality=settings.BROTLI_QUALITY,
+    )
 
     # Include routers with prefixes
     app.include_router(auth.router, prefix="/auth")
     app.include_router(recipes.router, prefix="/recipes")
     app.include_router(users.router, prefix="/users")
+    app.include_router(events.router, prefix="/events")
+    app.include_router(metrics.router)
+    app.include_router(health.router)
+    app.include_router(profiles.router, prefix="/admin/profiles")
+
+    # Outermost, so a profile covers admission and compression too. Nothing is
+    # installed unless enabled, so normal requests pay no profiling overhead.
+    if settings.PROFILING_ENABLED:
+        app.state.profiles = ProfileStore(settings.PROFILING_BUFFER_SIZE)
+        instrument_routes(app.routes, settings.PROFILING_INTERVAL)
+        app.add_middleware(
+            ProfilingMiddleware,
+            store=app.state.profiles,
+            sample_rate=settings.PROFILING_SAMPLE_RATE,
+            admin_token=settings.ADMIN_TOKEN,
+            interval=settings.PROFILING_INTERVAL,
+        )
 
     return app
 
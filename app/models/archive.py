@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, Index, Integer
+from sqlalchemy.dialects.postgresql import JSONB
+from app.models.base_class import Base
+from app.models.recipe import utc_now
+
+class RecipeArchive(Base):
+    """
+    Deleted recipes, moved out of the live tables by crud_recipe.delete_recipes.
+
+    The recipe row and its notes are kept as JSON snapshots, so a deletion
+    can be inspected or undone by hand without the live tables carrying
+    dead rows or a deleted flag in every query.
+    """
+    __tablename__ = "recipe_archive"
+    id = Column(Integer, primary_key=True)  # the recipe's original id
+    owner_id = Column(Integer, nullable=False)
+    recipe = Column(JSONB, nullable=False)
+    notes = Column(JSONB, nullable=False)
+    favorites_count = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, server_default=utc_now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_recipe_archive_owner_id_deleted_at", "owner_id", "deleted_at"),
+    )
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, DateTime, ForeignKeyConstraint, Index, Integer
+from sqlalchemy.dialects.postgresql import JSONB
+from app.models.base_class import Base
+from app.models.recipe import utc_now
+
+class RecipeCard(Base):
+    """
+    Listing summary of a recipe, rendered by app.jobs.recipe_cards.
+
+    `card` is the RecipeCardOut JSON, so GET /recipes/cards serves it as-is.
+    """
+    __tablename__ = "recipe_cards"
+    recipe_id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, nullable=False)
+    card = Column(JSONB, nullable=False)
+    rendered_at = Column(DateTime, server_default=utc_now(), nullable=False)
+
+    __table_args__ = (
+        # A user's cards, newest recipe first, paged by recipe id
+        Index("ix_recipe_cards_owner_id_recipe_id", "owner_id", "recipe_id"),
+        ForeignKeyConstraint(["recipe_id", "owner_id"], ["recipes.id", "recipes.owner_id"], ondelete="CASCADE"),
+    )
+
+class StaleRecipeCard(Base):
+    """
+    Recipes whose card has to be rendered again, queued by the writes that
+    changed them. No foreign key; crud_recipe.delete_recipes removes the
+    rows of deleted recipes, and the worker skips any it still finds.
+    """
+    __tablename__ = "stale_recipe_cards"
+    recipe_id = Column(Integer, primary_key=True)
+    queued_at = Column(DateTime, server_default=utc_now(), nullable=False)
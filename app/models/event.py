@@ -0,0 +1,33 @@
+from sqlalchemy import Column, BigInteger, Integer, Sequence, String, DateTime, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+from app.models.base_class import Base
+
+# Not a column default: only the relay draws from it (see migration e1b5203f53fe)
+FEED_SEQUENCE = Sequence("outbox_events_feed_seq", data_type=BigInteger)
+
+class OutboxEvent(Base):
+    """
+    Change event written in the same transaction as the change itself.
+
+    `seq` is the position in the public feed. It is assigned by the outbox
+    relay after commit, in the order the relay sees events, so a consumer
+    reading `seq > cursor` never misses an event that committed late. The
+    numbers come from FEED_SEQUENCE rather than max(seq), so they keep
+    growing after old events are pruned.
+    """
+    __tablename__ = "outbox_events"
+    id = Column(BigInteger, primary_key=True)
+    seq = Column(BigInteger, unique=True, nullable=True)
+    aggregate = Column(String, nullable=False)     # "recipe", "favorite" or "note"
+    aggregate_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)        # "created", "updated" or "deleted"
+    user_id = Column(Integer, nullable=True)       # owner or acting user
+    payload = Column(JSONB, nullable=False, default=dict)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    published_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # The relay only ever scans the unpublished tail
+        Index("ix_outbox_events_unpublished", "id", postgresql_where=text("seq IS NULL")),
+    )
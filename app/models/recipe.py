@@ -1,40 +1,114 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, ForeignKeyConstraint, DateTime, Index, func
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
 
+def utc_now():
+    # Database clock in UTC, so change timestamps from every worker are comparable
+    return func.timezone("utc", func.now())
+
+# recipes is hash partitioned by owner, and favorites and recipe_notes by the
+# owner of their recipe, so one user's rows live in the same partition of
+# each table. Unique keys on a partitioned table must contain the partition
+# key, hence the (id, owner) primary keys; ids still come from one sequence
+# each. Queries that know the owner should filter on it so Postgres only
+# visits that partition. The partitions themselves (recipes_p0 and so on)
+# are created by the migrations, not declared here.
+PARTITION_COUNT = 16
+
 class Recipe(Base):
     __tablename__ = "recipes"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String, index=True, nullable=False)
     cuisine = Column(String, nullable=False)
     # Use ARRAY type for ingredients
     ingredients = Column(ARRAY(String), nullable=False)
     tags = Column(String, nullable=True)
     steps = Column(String, nullable=False)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now(), server_default=utc_now(), nullable=False)
 
-    owner = relationship("User", backref="recipes")
-    favorites = relationship("Favorite", back_populates="recipe", cascade="all, delete-orphan")
-    notes = relationship("RecipeNote", back_populates="recipe", cascade="all, delete-orphan")
+    # Relationships never lazy load: a query that needs one asks for it with
+    # the loader options in app.crud.crud_recipe, and anything else raises.
+    owner = relationship("User", back_populates="recipes", lazy="raise_on_sql")
+    # The database deletes favorites and notes with their recipe (ON DELETE
+    # CASCADE); passive_deletes keeps the ORM from loading them first.
+    favorites = relationship("Favorite", back_populates="recipe", cascade="all, delete-orphan",
+                             passive_deletes=True, lazy="raise_on_sql")
+    notes = relationship("RecipeNote", back_populates="recipe", cascade="all, delete-orphan",
+                         passive_deletes=True, lazy="raise_on_sql")
+
+    __table_args__ = (
+        # Incremental sync: a user's recipes changed since a point in time
+        Index("ix_recipes_owner_id_updated_at", "owner_id", "updated_at"),
+        # Per-user recipe counts by cuisine, answered from the index alone
+        Index("ix_recipes_owner_id_cuisine", "owner_id", "cuisine"),
+        {"postgresql_partition_by": "HASH (owner_id)"},
+    )
 
 class Favorite(Base):
     __tablename__ = "favorites"
-    id = Column(Integer, primary_key=True, index=True)
-    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recipe_id = Column(Integer, nullable=False)
+    # The recipe's owner, not the user who favorited it (that is user_id)
+    recipe_owner_id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # NULL for favorites recorded before the column existed
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now(), server_default=utc_now(), nullable=False)
+
+    recipe = relationship("Recipe", back_populates="favorites", lazy="raise_on_sql")
+    user = relationship("User", back_populates="favorites", lazy="raise_on_sql")
 
-    recipe = relationship("Recipe", back_populates="favorites")
-    user = relationship("User", backref="favorites")
+    __table_args__ = (
+        # "What has this user favorited" lookups (is_favorite, recommendations)
+        Index("ix_favorites_user_id_recipe_id", "user_id", "recipe_id"),
+        # Per-recipe favorite counts and co-occurrence lookups
+        Index("ix_favorites_recipe_id_user_id", "recipe_id", "user_id"),
+        # Trending rollup only reads the most recent favorites
+        Index("ix_favorites_created_at", "created_at"),
+        Index("ix_favorites_user_id_updated_at", "user_id", "updated_at"),
+        ForeignKeyConstraint(["recipe_id", "recipe_owner_id"], ["recipes.id", "recipes.owner_id"], ondelete="CASCADE"),
+        {"postgresql_partition_by": "HASH (recipe_owner_id)"},
+    )
 
 class RecipeNote(Base):
     __tablename__ = "recipe_notes"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     text = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    recipe_id = Column(Integer, nullable=False)
+    recipe_owner_id = Column(Integer, primary_key=True)  # see Favorite.recipe_owner_id
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now(), server_default=utc_now(), nullable=False)
+
+    recipe = relationship("Recipe", back_populates="notes", lazy="raise_on_sql")
+    user = relationship("User", back_populates="recipe_notes", lazy="raise_on_sql")
+
+    __table_args__ = (
+        Index("ix_recipe_notes_user_id_updated_at", "user_id", "updated_at"),
+        # A recipe's notes in listing order, for keyset pagination
+        Index("ix_recipe_notes_recipe_id_created_at_id", "recipe_id", "created_at", "id"),
+        ForeignKeyConstraint(["recipe_id", "recipe_owner_id"], ["recipes.id", "recipes.owner_id"], ondelete="CASCADE"),
+        {"postgresql_partition_by": "HASH (recipe_owner_id)"},
+    )
+
+class Ingredient(Base):
+    __tablename__ = "ingredient"
+    id = Column(Integer, primary_key=True)
+    # Normalized name (lower-cased, whitespace collapsed), see crud_recipe.normalize_ingredient
+    name = Column(String, unique=True, nullable=False)
+
+class RecipeIngredient(Base):
+    """Inverted index from normalized ingredients to the recipes that use them."""
+    __tablename__ = "recipe_ingredient"
+    # No foreign key: recipes is partitioned, so one would need the owner id
+    # here too. crud_recipe deletes these rows along with the recipe.
+    recipe_id = Column(Integer, primary_key=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredient.id", ondelete="CASCADE"), primary_key=True)
 
-    recipe = relationship("Recipe", back_populates="notes")
-    user = relationship("User", backref="recipe_notes")
\ No newline at end of file
+    __table_args__ = (
+        # Lookup direction for pantry queries: ingredient -> recipes (index-only scans)
+        Index("ix_recipe_ingredient_ingredient_id_recipe_id", "ingredient_id", "recipe_id"),
+    )
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, BigInteger, Integer, Float, DateTime
+from app.models.base_class import Base
+
+class RecipeNeighbor(Base):
+    """
+    Top-K item-item neighbors computed offline by app.jobs.recommendations.
+
+    Rows of deleted recipes, on either side, are removed by
+    crud_recipe.delete_recipes.
+    """
+    __tablename__ = "recipe_neighbors"
+    recipe_id = Column(Integer, primary_key=True)
+    neighbor_id = Column(Integer, primary_key=True)
+    # Cosine similarity of the two recipes' favorite vectors
+    score = Column(Float, nullable=False)
+
+class RecommendationState(Base):
+    """Single-row bookkeeping for incremental refreshes of recipe_neighbors."""
+    __tablename__ = "recommendation_state"
+    id = Column(Integer, primary_key=True)
+    # Highest outbox_events.seq folded into recipe_neighbors so far; NULL
+    # until the first full rebuild
+    last_event_seq = Column(BigInteger, nullable=True)
+    refreshed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,26 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer
+from app.models.base_class import Base
+
+class UserStats(Base):
+    """
+    Per-user counters too expensive to aggregate on every dashboard read.
+
+    Maintained in the same transaction as the writes that change them, see
+    app.crud.crud_stats.
+    """
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # Favorites on the user's recipes, by anyone
+    favorites_received = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+class UserIngredientCount(Base):
+    """How many of a user's recipes use each (normalized) ingredient."""
+    __tablename__ = "user_ingredient_counts"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredient.id", ondelete="CASCADE"), primary_key=True)
+    recipe_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Top ingredients for a user without sorting all of them
+        Index("ix_user_ingredient_counts_user_id_recipe_count", "user_id", "recipe_count"),
+    )
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.models.base_class import Base
+from app.models.recipe import utc_now
+
+class SyncTombstone(Base):
+    """
+    Record of a deletion, kept so offline clients can drop what they cached.
+
+    entity is "recipe", "note" or "favorite"; for favorites entity_id is the
+    recipe id, since that is how clients key favorite state.
+    """
+    __tablename__ = "sync_tombstones"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=utc_now(), server_default=utc_now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_id_deleted_at", "user_id", "deleted_at"),
+    )
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.models.base_class import Base
+
+class TrendingRecipe(Base):
+    """Rollup of the most favorited recipes per time window, rebuilt by app.jobs.trending."""
+    __tablename__ = "trending_recipes"
+    time_window = Column(String, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    recipe_id = Column(Integer, nullable=False)  # deleted with the recipe by crud_recipe.delete_recipes
+    # Favorites received inside the window, and all-time, as of refreshed_at
+    window_favorites = Column(Integer, nullable=False)
+    total_favorites = Column(Integer, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False)
@@ -1,8 +1,14 @@
 from sqlalchemy import Column, Integer, String
+from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
\ No newline at end of file
+    hashed_password = Column(String, nullable=False)
+
+    # Never lazy loaded, see Recipe
+    recipes = relationship("Recipe", back_populates="owner", lazy="raise_on_sql")
+    favorites = relationship("Favorite", back_populates="user", lazy="raise_on_sql")
+    recipe_notes = relationship("RecipeNote", back_populates="user", lazy="raise_on_sql")
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, List
+
+class EventOut(BaseModel):
+    seq: int
+    aggregate: str
+    aggregate_id: int
+    action: str
+    user_id: int | None = None
+    payload: Dict[str, Any]
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class EventPage(BaseModel):
+    events: List[EventOut]
+    # Pass back as ?after= to continue; unchanged when there is nothing new
+    next_cursor: int
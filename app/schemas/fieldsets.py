@@ -0,0 +1,36 @@
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Type
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[FrozenSet[str]]:
+    """
+    Parse a sparse fieldset such as "id,title,cuisine".
+
+    Returns None when no fieldset was requested, and raises ValueError
+    naming any field the model does not have.
+    """
+    if fields is None:
+        return None
+    requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = requested - model.model_fields.keys()
+    if unknown or not requested:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown)) or '(none given)'}")
+    return requested
+
+
+@lru_cache(maxsize=128)
+def _list_adapter(model: Type[BaseModel], fields: FrozenSet[str]) -> TypeAdapter:
+    # A model with only the requested fields, so nothing else is read or validated
+    partial = create_model(
+        f"{model.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (info.annotation, info) for name, info in model.model_fields.items() if name in fields},
+    )
+    return TypeAdapter(List[partial])
+
+
+def dump_fields(model: Type[BaseModel], fields: FrozenSet[str], objs) -> bytes:
+    """Serialize objs (ORM rows or dicts) to JSON with only the given fields of model."""
+    return _list_adapter(model, fields).dump_json(list(objs))
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+class ProfileOut(BaseModel):
+    id: int
+    method: str
+    path: str
+    status_code: int
+    duration_ms: float
+    # "admin" when asked for with X-Profile, "sampled" when picked at random
+    trigger: str
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
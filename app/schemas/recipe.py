@@ -1,6 +1,7 @@
 from pydantic import BaseModel, conlist
 from datetime import datetime
 from typing import List
+from app.schemas.user import UserOut
 
 class RecipeBase(BaseModel):
     title: str
@@ -22,6 +23,30 @@ class RecipeOut(RecipeBase):
     class Config:
         orm_mode = True
 
+class PantryRecipeOut(RecipeOut):
+    matched_ingredients: int
+    total_ingredients: int
+    coverage: float  # matched_ingredients / total_ingredients
+
+class ScoredRecipeOut(RecipeOut):
+    score: float  # Similarity from the favorites co-occurrence model
+
+class TrendingRecipeOut(RecipeOut):
+    rank: int
+    window_favorites: int  # Favorites received inside the requested window
+    refreshed_at: datetime
+
+class RecipeCardOut(BaseModel):
+    # Rendered by app.jobs.recipe_cards; field names match the stored JSON
+    id: int
+    title: str
+    cuisine: str
+    ingredient_count: int
+    steps_excerpt: str
+    favorite_count: int
+    note_count: int
+    updated_at: datetime
+
 class RecipeNoteCreate(BaseModel):
     text: str
 
@@ -30,6 +55,8 @@ class RecipeNoteOut(BaseModel):
     text: str
     created_at: datetime
     user_id: int
+    # Only with ?include_author=true
+    author: UserOut | None = None
 
     class Config:
         orm_mode = True
\ No newline at end of file
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import List
+from app.schemas.recipe import RecipeBase, RecipeNoteOut
+
+class SyncRecipeOut(RecipeBase):
+    # No favorite counts: favoriting does not touch the recipe, so they
+    # would go stale between syncs. The user's own favorites are synced below.
+    id: int
+    owner_id: int
+
+    class Config:
+        orm_mode = True
+
+class SyncNoteOut(RecipeNoteOut):
+    recipe_id: int
+
+class SyncDeleted(BaseModel):
+    recipes: List[int]
+    notes: List[int]
+    favorites: List[int]  # recipe ids that are no longer favorited
+
+class SyncOut(BaseModel):
+    recipes: List[SyncRecipeOut]    # created or updated
+    notes: List[SyncNoteOut]        # created or updated
+    favorites: List[int]            # recipe ids favorited
+    deleted: SyncDeleted
+    # More pages of this sync follow; fetch them with ?since=next_token
+    has_more: bool
+    # Opaque; send back as ?since= on the next call
+    next_token: str
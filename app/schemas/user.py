@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr
+from typing import List
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -19,4 +20,20 @@ class UserOut(UserBase):
     id: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class CuisineCount(BaseModel):
+    cuisine: str
+    count: int
+
+class IngredientCount(BaseModel):
+    name: str
+    # Number of the user's recipes that use it
+    count: int
+
+class UserStatsOut(BaseModel):
+    recipe_count: int
+    recipes_by_cuisine: List[CuisineCount]
+    top_ingredients: List[IngredientCount]
+    favorites_received: int
+    notes_written: int
@@ -0,0 +1,190 @@
+"""
+Owner-scoped query latency with plain and hash-partitioned tables.
+
+Builds two copies of recipes, favorites and recipe_notes with synthetic
+rows in throwaway schemas of the configured database: one laid out like
+the tables before migration 9b0b3afeff6f, one partitioned by owner like
+after it. Then times the queries the recipe
+endpoints run for one owner, a per-user favorites lookup that has to probe
+every partition, and a VACUUM of what a partition holds:
+
+    python -m benchmarks.bench_partitioning [--users 2000] [--recipes-per-user 50]
+
+The schemas are dropped afterwards unless --keep is given.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.models.recipe import PARTITION_COUNT
+
+SCHEMAS = ("bench_plain", "bench_hash")
+
+PLAIN_TABLES = """
+CREATE TABLE recipes (
+    id serial PRIMARY KEY, owner_id integer NOT NULL, title text NOT NULL,
+    cuisine text NOT NULL, steps text NOT NULL, updated_at timestamp NOT NULL
+);
+CREATE TABLE favorites (
+    id serial PRIMARY KEY, user_id integer NOT NULL, recipe_id integer NOT NULL,
+    recipe_owner_id integer NOT NULL, created_at timestamp NOT NULL, updated_at timestamp NOT NULL
+);
+CREATE TABLE recipe_notes (
+    id serial PRIMARY KEY, user_id integer NOT NULL, recipe_id integer NOT NULL,
+    recipe_owner_id integer NOT NULL, text text NOT NULL, created_at timestamp NOT NULL
+);
+"""
+
+PARTITIONED_TABLES = """
+CREATE TABLE recipes (
+    id serial, owner_id integer NOT NULL, title text NOT NULL,
+    cuisine text NOT NULL, steps text NOT NULL, updated_at timestamp NOT NULL,
+    PRIMARY KEY (id, owner_id)
+) PARTITION BY HASH (owner_id);
+CREATE TABLE favorites (
+    id serial, user_id integer NOT NULL, recipe_id integer NOT NULL,
+    recipe_owner_id integer NOT NULL, created_at timestamp NOT NULL, updated_at timestamp NOT NULL,
+    PRIMARY KEY (id, recipe_owner_id)
+) PARTITION BY HASH (recipe_owner_id);
+CREATE TABLE recipe_notes (
+    id serial, user_id integer NOT NULL, recipe_id integer NOT NULL,
+    recipe_owner_id integer NOT NULL, text text NOT NULL, created_at timestamp NOT NULL,
+    PRIMARY KEY (id, recipe_owner_id)
+) PARTITION BY HASH (recipe_owner_id);
+"""
+
+# The secondary indexes the app has on these tables
+INDEXES = """
+CREATE INDEX ON recipes (owner_id, updated_at);
+CREATE INDEX ON favorites (user_id, recipe_id);
+CREATE INDEX ON favorites (recipe_id, user_id);
+CREATE INDEX ON favorites (user_id, updated_at);
+CREATE INDEX ON recipe_notes (recipe_id, created_at, id);
+"""
+
+# Recipes of one owner are spread over the id range, as they would be when
+# many users write at once.
+ROWS = """
+INSERT INTO recipes (owner_id, title, cuisine, steps, updated_at)
+SELECT 1 + (n::bigint * 7919) % :users, 'Recipe ' || n, (ARRAY['Indian', 'Thai', 'Italian'])[1 + n % 3],
+       repeat('chop fry simmer stir ', 20), now() - n * interval '1 second'
+FROM generate_series(1, :users * :recipes_per_user) n;
+
+INSERT INTO favorites (user_id, recipe_id, recipe_owner_id, created_at, updated_at)
+SELECT 1 + (r.id * 31 + k * 7919) % :users, r.id, r.owner_id, now(), now()
+FROM recipes r, generate_series(1, :favorites_per_recipe) k;
+
+INSERT INTO recipe_notes (user_id, recipe_id, recipe_owner_id, text, created_at)
+SELECT 1 + (r.id * 17 + k) % :users, r.id, r.owner_id, 'note ' || k, now() - k * interval '1 minute'
+FROM recipes r, generate_series(1, :notes_per_recipe) k;
+"""
+
+# name -> (query, extra condition naming the partition key). Every query
+# is run the same way in both schemas; the condition is what the app adds
+# so Postgres can prune partitions, and is harmless on the plain tables.
+QUERIES = {
+    "recipe page": (
+        "SELECT id, title FROM recipes WHERE owner_id = :owner {owned} ORDER BY updated_at DESC LIMIT 20", "",
+    ),
+    "favorite counts for page": (
+        "SELECT recipe_id, count(*) FROM favorites WHERE recipe_id = ANY(:page) {owned} GROUP BY recipe_id",
+        "AND recipe_owner_id = :owner",
+    ),
+    "notes page": (
+        "SELECT id, text FROM recipe_notes WHERE recipe_id = :recipe {owned} ORDER BY created_at, id LIMIT 50",
+        "AND recipe_owner_id = :owner",
+    ),
+    "user's favorites (all partitions)": (
+        "SELECT recipe_id FROM favorites WHERE user_id = :owner {owned} ORDER BY updated_at DESC LIMIT 50", "",
+    ),
+}
+
+def build(connection, schema: str, statements: str, params: dict):
+    connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    connection.execute(text(f"CREATE SCHEMA {schema}"))
+    connection.execute(text(f"SET search_path TO {schema}"))
+    for statement in filter(str.strip, statements.split(";")):
+        connection.execute(text(statement))
+    if schema == "bench_hash":
+        for table in ("recipes", "favorites", "recipe_notes"):
+            for remainder in range(PARTITION_COUNT):
+                connection.execute(text(
+                    f"CREATE TABLE {table}_p{remainder} PARTITION OF {table} "
+                    f"FOR VALUES WITH (MODULUS {PARTITION_COUNT}, REMAINDER {remainder})"
+                ))
+    for statement in filter(str.strip, INDEXES.split(";")):
+        connection.execute(text(statement))
+    for statement in filter(str.strip, ROWS.split(";")):
+        connection.execute(text(statement), params)
+    connection.execute(text("VACUUM ANALYZE"))
+
+def time_query(connection, sql: str, owners: list, recipes: dict) -> list:
+    timings = []
+    for owner in owners:
+        page = recipes[owner]
+        started = time.perf_counter()
+        connection.execute(text(sql), {"owner": owner, "page": page, "recipe": page[0]}).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--recipes-per-user", type=int, default=50)
+    parser.add_argument("--favorites-per-recipe", type=int, default=5)
+    parser.add_argument("--notes-per-recipe", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=500, help="owners sampled per query")
+    parser.add_argument("--keep", action="store_true", help="leave the schemas in place")
+    args = parser.parse_args()
+
+    from app.db.session import engine
+    params = {
+        "users": args.users,
+        "recipes_per_user": args.recipes_per_user,
+        "favorites_per_recipe": args.favorites_per_recipe,
+        "notes_per_recipe": args.notes_per_recipe,
+    }
+    rng = random.Random(0)
+    owners = [rng.randint(1, args.users) for _ in range(args.repeat)]
+    results = {}
+    # AUTOCOMMIT so VACUUM can run
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        try:
+            for schema, tables in zip(SCHEMAS, (PLAIN_TABLES, PARTITIONED_TABLES)):
+                started = time.perf_counter()
+                build(connection, schema, tables, params)
+                print(f"{schema}: built in {time.perf_counter() - started:.1f}s")
+                recipes = {
+                    owner: connection.scalars(text(
+                        "SELECT id FROM recipes WHERE owner_id = :owner ORDER BY updated_at DESC LIMIT 20"
+                    ), {"owner": owner}).all()
+                    for owner in set(owners)
+                }
+                for name, (sql, owned) in QUERIES.items():
+                    sql = sql.format(owned=owned)
+                    time_query(connection, sql, owners[:50], recipes)  # warm the cache
+                    results[schema, name] = time_query(connection, sql, owners, recipes)
+
+                connection.execute(text("UPDATE favorites SET updated_at = now() WHERE recipe_owner_id % 100 = 0"))
+                vacuumed = "favorites_p0" if schema == "bench_hash" else "favorites"
+                started = time.perf_counter()
+                connection.execute(text(f"VACUUM {vacuumed}"))
+                results[schema, f"VACUUM {vacuumed}"] = [(time.perf_counter() - started) * 1000]
+        finally:
+            if not args.keep:
+                for schema in SCHEMAS:
+                    connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+
+    rows = args.users * args.recipes_per_user
+    print(f"{args.users} users, {rows} recipes, {rows * args.favorites_per_recipe} favorites, "
+          f"{rows * args.notes_per_recipe} notes, {PARTITION_COUNT} partitions")
+    print(f"{'query':<36}{'schema':<13}{'median ms':>11}{'p95 ms':>10}")
+    for (schema, name), timings in sorted(results.items(), key=lambda item: (item[0][1], item[0][0])):
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        print(f"{name:<36}{schema:<13}{statistics.median(timings):>11.3f}{p95:>10.3f}")
+
+if __name__ == "__main__":
+    main()
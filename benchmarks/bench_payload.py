@@ -0,0 +1,78 @@
+"""
+Bytes on the wire and CPU per response for recipe listings.
+
+Serializes a page of synthetic recipes the way list_recipes does, with and
+without a sparse fieldset, then compresses it the way CompressionMiddleware
+does. No database or server is needed:
+
+    python -m benchmarks.bench_payload [--recipes 100] [--repeat 50]
+"""
+import argparse
+import gzip
+import random
+import time
+from types import SimpleNamespace
+from typing import List
+
+import brotli
+from pydantic import TypeAdapter
+
+from app.schemas.fieldsets import dump_fields
+from app.schemas.recipe import RecipeOut
+
+WORDS = "chop fry simmer stir onion garlic ginger tomato masala until golden then add salt to taste".split()
+
+def make_recipes(count: int):
+    rng = random.Random(0)
+    return [
+        SimpleNamespace(
+            id=i,
+            owner_id=1,
+            title=f"Recipe {i}",
+            cuisine=rng.choice(["Indian", "Thai", "Italian"]),
+            ingredients=rng.sample(WORDS, 6),
+            tags="dinner",
+            steps=" ".join(rng.choice(WORDS) for _ in range(rng.randint(100, 300))),
+            total_favorites=rng.randint(0, 50),
+            is_favorite=False,
+        )
+        for i in range(count)
+    ]
+
+def cpu_per_call(fn, repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        result = fn()
+    return (time.process_time() - start) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recipes", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    recipes = make_recipes(args.recipes)
+    full = TypeAdapter(List[RecipeOut])
+    payloads = {
+        "full": lambda: full.dump_json([RecipeOut.model_validate(r, from_attributes=True) for r in recipes]),
+        "fields=id,title,cuisine": lambda: dump_fields(RecipeOut, frozenset({"id", "title", "cuisine"}), recipes),
+    }
+    encoders = {
+        "identity": lambda body: body,
+        "gzip-6": lambda body: gzip.compress(body, compresslevel=6),
+        "gzip-9": lambda body: gzip.compress(body, compresslevel=9),
+        "br-4": lambda body: brotli.compress(body, quality=4),
+        "br-11": lambda body: brotli.compress(body, quality=11),
+    }
+
+    print(f"{args.recipes} recipes per response, {args.repeat} repetitions")
+    print(f"{'payload':<26}{'encoding':<10}{'bytes':>10}{'serialize us':>14}{'compress us':>13}")
+    for payload_name, serialize in payloads.items():
+        serialize_cpu, body = cpu_per_call(serialize, args.repeat)
+        for encoding, encode in encoders.items():
+            compress_cpu, encoded = cpu_per_call(lambda: encode(body), args.repeat)
+            print(f"{payload_name:<26}{encoding:<10}{len(encoded):>10}"
+                  f"{serialize_cpu * 1e6:>14.0f}{compress_cpu * 1e6:>13.0f}")
+
+if __name__ == "__main__":
+    main()
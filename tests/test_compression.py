@@ -0,0 +1,14 @@
+import pytest
+from app.core.compression import negotiate_encoding
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("*", "br"),
+    ("gzip;q=0", "identity"),
+    ("", "identity"),
+    ("identity", "identity"),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
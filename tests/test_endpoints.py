@@ -184,4 +184,758 @@ def test_add_and_list_recipe_note():
     list_resp = client.get(f"/recipes/{recipe_id}/notes")
     assert list_resp.status_code == 200
     notes = list_resp.json()
-    assert any(note["id"] == note_id for note in notes)
\ No newline at end of file
+    assert any(note["id"] == note_id for note in notes)
+
+def test_list_recipes_by_pantry():
+    # Ingredient names are unique to this test so other recipes don't match.
+    full = {
+        "title": "Pantry Full Match",
+        "cuisine": "Pantry Cuisine",
+        "ingredients": ["Pantry Rice", "pantry  dal"],
+        "tags": "pantry",
+        "steps": "cook"
+    }
+    partial = {
+        "title": "Pantry Partial Match",
+        "cuisine": "Pantry Cuisine",
+        "ingredients": ["pantry rice", "pantry saffron", "pantry ghee"],
+        "tags": "pantry",
+        "steps": "cook"
+    }
+    full_id = client.post("/recipes", json=full).json()["id"]
+    partial_id = client.post("/recipes", json=partial).json()["id"]
+
+    response = client.get("/recipes/by-pantry?have=PANTRY RICE, pantry dal")
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["id"] for r in results] == [full_id, partial_id]
+    assert results[0]["coverage"] == 1.0
+    assert results[1]["matched_ingredients"] == 1
+    assert results[1]["total_ingredients"] == 3
+
+def test_pantry_index_follows_updates():
+    recipe_data = {
+        "title": "Pantry Update",
+        "cuisine": "Pantry Cuisine",
+        "ingredients": ["pantry paneer"],
+        "tags": "pantry",
+        "steps": "cook"
+    }
+    recipe_id = client.post("/recipes", json=recipe_data).json()["id"]
+    client.patch(f"/recipes/{recipe_id}", json={"ingredients": ["pantry tofu"]})
+
+    assert client.get("/recipes/by-pantry?have=pantry paneer").json() == []
+    results = client.get("/recipes/by-pantry?have=pantry tofu").json()
+    assert [r["id"] for r in results] == [recipe_id]
+
+    # Filtering the main listing goes through the same index.
+    listed = client.get("/recipes?ingredients=Pantry Tofu&limit=50").json()
+    assert recipe_id in [r["id"] for r in listed]
+    # The whole normalized name has to match, not a part of it.
+    listed = client.get("/recipes?ingredients=tofu&limit=50").json()
+    assert recipe_id not in [r["id"] for r in listed]
+
+def test_similar_and_recommended_recipes():
+    from app.db.session import SessionLocal
+    from app.models.recipe import Favorite
+    from app.jobs.recommendations import refresh_neighbors
+
+    recipe_data = {
+        "title": "Similar Recipe",
+        "cuisine": "Similar Cuisine",
+        "ingredients": ["sim1"],
+        "tags": "similar",
+        "steps": "cook"
+    }
+    a, b, c = (client.post("/recipes", json=recipe_data).json()["id"] for _ in range(3))
+    other_ids = [
+        client.post("/auth/register", json={"email": f"similar{i}@example.com", "password": "pw"}).json()["id"]
+        for i in range(2)
+    ]
+    db = SessionLocal()
+    try:
+        # Both other users like a and b together; one of them also likes c.
+        db.add_all([Favorite(user_id=u, recipe_id=r, recipe_owner_id=1) for u in other_ids for r in (a, b)])
+        db.add(Favorite(user_id=other_ids[0], recipe_id=c, recipe_owner_id=1))
+        db.commit()
+        refresh_neighbors(db, full=True)
+    finally:
+        db.close()
+
+    similar = client.get(f"/recipes/{a}/similar").json()
+    assert [r["id"] for r in similar][:2] == [b, c]
+    assert similar[0]["score"] > similar[1]["score"]
+    assert client.get("/recipes/999999/similar").status_code == 404
+
+    # The current user favorites a, so b and c are recommended but a is not.
+    client.post(f"/recipes/{a}/favorite")
+    recommended = [r["id"] for r in client.get("/recipes/recommended").json()]
+    assert b in recommended and c in recommended
+    assert a not in recommended
+
+def test_incremental_recommendation_refresh():
+    from sqlalchemy import text
+    from app.crud.crud_event import record_event
+    from app.db.session import SessionLocal
+    from app.models.recipe import Favorite
+    from app.jobs.outbox_relay import relay_pending
+    from app.jobs.recommendations import refresh_neighbors
+
+    recipe_data = {
+        "title": "Incremental Recipe",
+        "cuisine": "Incremental Cuisine",
+        "ingredients": ["inc1"],
+        "tags": "incremental",
+        "steps": "cook"
+    }
+    a, b = (client.post("/recipes", json=recipe_data).json()["id"] for _ in range(2))
+    user_id = client.post("/auth/register", json={"email": "incremental@example.com", "password": "pw"}).json()["id"]
+    db = SessionLocal()
+    try:
+        relay_pending(db)
+        refresh_neighbors(db)
+        assert client.get(f"/recipes/{a}/similar").json() == []
+        # The favorite of b draws its id first but commits after a's has been
+        # relayed and folded in, as a slow transaction would.
+        late_id = db.scalar(text("SELECT nextval('favorites_id_seq')"))
+        first = Favorite(user_id=user_id, recipe_id=a, recipe_owner_id=1)
+        db.add(first)
+        db.flush()
+        record_event(db, "favorite", first.id, "created", user_id, recipe_id=a)
+        db.commit()
+        relay_pending(db)
+        assert refresh_neighbors(db) == 0
+        db.add(Favorite(id=late_id, user_id=user_id, recipe_id=b, recipe_owner_id=1))
+        record_event(db, "favorite", late_id, "created", user_id, recipe_id=b)
+        db.commit()
+        relay_pending(db)
+        assert refresh_neighbors(db) == 2
+    finally:
+        db.close()
+    assert [r["id"] for r in client.get(f"/recipes/{a}/similar").json()] == [b]
+
+def test_recommendation_refresh_streams_favorites():
+    import tracemalloc
+    from sqlalchemy import text
+    from app.db.session import SessionLocal, engine
+    from app.jobs.recommendations import refresh_neighbors
+
+    # 4000 users with 5 favorites each over 400 recipes: loaded whole, the
+    # 20k favorites take several times the 1 MB budget.
+    db = SessionLocal()
+    try:
+        db.execute(text(
+            "INSERT INTO users (email, hashed_password) "
+            "SELECT 'streamed' || n || '@example.com', 'x' FROM generate_series(1, 4000) n"
+        ))
+        db.execute(text(
+            "INSERT INTO recipes (title, cuisine, ingredients, steps, owner_id) "
+            "SELECT 'Streamed Recipe', 'Streamed Cuisine', '{streamed}', 'cook', "
+            "(SELECT min(id) FROM users WHERE email LIKE 'streamed%') FROM generate_series(1, 400)"
+        ))
+        db.execute(text(
+            "INSERT INTO favorites (user_id, recipe_id, recipe_owner_id, created_at) "
+            "SELECT u.id, r.id, r.owner_id, now() FROM "
+            "(SELECT id, row_number() OVER (ORDER BY id) AS n FROM users WHERE email LIKE 'streamed%') u "
+            "CROSS JOIN generate_series(0, 4) k "
+            "JOIN (SELECT id, owner_id, row_number() OVER (ORDER BY id) AS n FROM recipes WHERE title = 'Streamed Recipe') r "
+            "ON r.n = 1 + (u.n * 7 + k * 41) % 400"
+        ))
+        db.commit()
+
+        # Statement logging, kept by pytest, would count against the peak.
+        engine.echo = False
+        tracemalloc.start()
+        try:
+            refresh_neighbors(db, full=True, memory_budget_mb=1)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            engine.echo = True
+        # The budget plus one fetch batch of rows (about 1 MB)
+        assert peak < 3 * 2**20
+
+        neighbors = text(
+            "SELECT recipe_id, neighbor_id, round(score::numeric, 6) FROM recipe_neighbors "
+            "WHERE recipe_id IN (SELECT id FROM recipes WHERE title = 'Streamed Recipe') ORDER BY 1, 2"
+        )
+        streamed = db.execute(neighbors).all()
+        assert streamed
+        # Computed in one block, the neighbor lists are the same.
+        refresh_neighbors(db, full=True)
+        assert db.execute(neighbors).all() == streamed
+    finally:
+        db.rollback()
+        streamed_recipes = "(SELECT id FROM recipes WHERE title = 'Streamed Recipe')"
+        db.execute(text(
+            f"DELETE FROM recipe_neighbors WHERE recipe_id IN {streamed_recipes} OR neighbor_id IN {streamed_recipes}"
+        ))
+        db.execute(text("DELETE FROM favorites WHERE user_id IN (SELECT id FROM users WHERE email LIKE 'streamed%')"))
+        db.execute(text("DELETE FROM recipes WHERE title = 'Streamed Recipe'"))
+        db.execute(text("DELETE FROM users WHERE email LIKE 'streamed%'"))
+        db.commit()
+        db.close()
+
+def test_trending_recipes():
+    from datetime import datetime, timedelta
+    from app.db.session import SessionLocal
+    from app.models.recipe import Favorite
+    from app.jobs.trending import refresh_trending
+
+    recipe_data = {
+        "title": "Trending Recipe",
+        "cuisine": "Trending Cuisine",
+        "ingredients": ["trend1"],
+        "tags": "trending",
+        "steps": "cook"
+    }
+    fresh, older = (client.post("/recipes", json=recipe_data).json()["id"] for _ in range(2))
+    fans = [
+        client.post("/auth/register", json={"email": f"trending{i}@example.com", "password": "pw"}).json()["id"]
+        for i in range(4)
+    ]
+    ten_days_ago = datetime.utcnow() - timedelta(days=10)
+    db = SessionLocal()
+    try:
+        db.add_all([Favorite(user_id=u, recipe_id=fresh, recipe_owner_id=1) for u in fans])
+        db.add_all([Favorite(user_id=u, recipe_id=older, recipe_owner_id=1, created_at=ten_days_ago) for u in fans])
+        db.commit()
+        refresh_trending(db)
+    finally:
+        db.close()
+
+    week = client.get("/recipes/trending?window=week&limit=100").json()
+    by_id = {r["id"]: r for r in week}
+    assert by_id[fresh]["window_favorites"] == 4
+    assert by_id[fresh]["total_favorites"] == 4
+    assert older not in by_id
+    assert [r["rank"] for r in week] == sorted(r["rank"] for r in week)
+
+    month = {r["id"]: r for r in client.get("/recipes/trending?window=month&limit=100").json()}
+    assert month[older]["window_favorites"] == 4
+
+    assert client.get("/recipes/trending?window=year").status_code == 422
+
+def test_list_recipes_sparse_fieldset():
+    recipe_data = {
+        "title": "Sparse Recipe",
+        "cuisine": "Sparse Cuisine",
+        "ingredients": ["sparse1"],
+        "tags": "sparse",
+        "steps": "a long description " * 50
+    }
+    client.post("/recipes", json=recipe_data)
+    response = client.get("/recipes?cuisine=Sparse&fields=id,title,cuisine")
+    assert response.status_code == 200
+    recipes = response.json()
+    assert recipes and all(set(r) == {"id", "title", "cuisine"} for r in recipes)
+
+    with_favorites = client.get("/recipes?cuisine=Sparse&fields=title,total_favorites").json()
+    assert set(with_favorites[0]) == {"title", "total_favorites"}
+
+    response = client.get("/recipes?fields=id,password")
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+def test_large_listing_is_compressed():
+    recipe_data = {
+        "title": "Compressed Recipe",
+        "cuisine": "Compressed Cuisine",
+        "ingredients": ["comp1"],
+        "tags": "compressed",
+        "steps": "stir and simmer " * 100
+    }
+    for _ in range(3):
+        client.post("/recipes", json=recipe_data)
+
+    for encoding in ("br", "gzip"):
+        response = client.get("/recipes?cuisine=Compressed&limit=50", headers={"Accept-Encoding": encoding})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == encoding
+        assert int(response.headers["content-length"]) < len(response.content)
+        assert len(response.json()) >= 3
+
+    # Below the minimum size nothing is compressed.
+    small = client.get("/recipes?cuisine=Compressed&fields=id&limit=1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+def test_change_events_feed(monkeypatch):
+    from sqlalchemy import func, select
+    from app.core.config import settings
+    from app.db.session import SessionLocal
+    from app.models.event import OutboxEvent
+    from app.jobs.outbox_relay import relay_pending
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "test-admin-token")
+    admin = {"X-Admin-Token": "test-admin-token"}
+    db = SessionLocal()
+    try:
+        relay_pending(db)
+        cursor = db.scalar(select(func.coalesce(func.max(OutboxEvent.seq), 0)))
+
+        recipe_data = {
+            "title": "Event Recipe",
+            "cuisine": "Event Cuisine",
+            "ingredients": ["event1"],
+            "tags": "events",
+            "steps": "cook"
+        }
+        recipe_id = client.post("/recipes", json=recipe_data).json()["id"]
+        client.patch(f"/recipes/{recipe_id}", json={"tags": "patched"})
+        client.post(f"/recipes/{recipe_id}/favorite")
+        client.post(f"/recipes/{recipe_id}/notes", json={"text": "event note"})
+        client.delete(f"/recipes/{recipe_id}/favorite")
+        client.delete(f"/recipes/{recipe_id}")
+
+        # Nothing is visible until the relay publishes it.
+        assert client.get(f"/events?after={cursor}", headers=admin).json()["events"] == []
+        assert relay_pending(db, batch_size=2) == 6
+    finally:
+        db.close()
+
+    page = client.get(f"/events?after={cursor}&limit=4", headers=admin).json()
+    rest = client.get(f"/events?after={page['next_cursor']}", headers=admin).json()
+    events = page["events"] + rest["events"]
+    assert [(e["aggregate"], e["action"]) for e in events] == [
+        ("recipe", "created"),
+        ("recipe", "updated"),
+        ("favorite", "created"),
+        ("note", "created"),
+        ("favorite", "deleted"),
+        ("recipe", "deleted"),
+    ]
+    assert events[1]["payload"] == {"fields": ["tags"]}
+    assert all(e["payload"].get("recipe_id", recipe_id) == recipe_id for e in events)
+    assert [e["seq"] for e in events] == list(range(cursor + 1, cursor + 7))
+    assert client.get(f"/events?after={rest['next_cursor']}", headers=admin).json() == {
+        "events": [], "next_cursor": rest["next_cursor"]
+    }
+
+    assert client.get("/events").status_code == 403
+    assert client.get("/events", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+def test_feed_positions_survive_pruning():
+    from sqlalchemy import func, select
+    from app.db.session import SessionLocal
+    from app.models.event import OutboxEvent
+    from app.jobs.outbox_relay import prune_published, relay_pending
+
+    recipe_data = {"title": "Pruned Feed", "cuisine": "Feed", "ingredients": ["feed1"], "steps": "go"}
+    db = SessionLocal()
+    try:
+        client.post("/recipes", json=recipe_data)
+        relay_pending(db)
+        last_seq = db.scalar(select(func.max(OutboxEvent.seq)))
+        # A retention window in the future prunes every published event
+        prune_published(db, retain_days=-1)
+        assert db.scalar(select(func.count()).select_from(OutboxEvent)) == 0
+
+        client.post("/recipes", json=recipe_data)
+        assert relay_pending(db) == 1
+        assert db.scalar(select(func.max(OutboxEvent.seq))) == last_seq + 1
+    finally:
+        db.close()
+
+def test_failed_write_records_no_event():
+    import pytest
+    from sqlalchemy.exc import IntegrityError
+    from app.crud import crud_recipe
+    from app.db.session import SessionLocal
+    from app.models.event import OutboxEvent
+    from app.models.recipe import Recipe
+
+    db = SessionLocal()
+    try:
+        with pytest.raises(IntegrityError):
+            crud_recipe.add_favorite(db, Recipe(id=987654321, owner_id=1), user_id=1)
+        db.rollback()
+        assert db.query(OutboxEvent).filter(OutboxEvent.aggregate == "favorite").filter(
+            OutboxEvent.payload["recipe_id"].astext == "987654321"
+        ).count() == 0
+    finally:
+        db.close()
+
+def test_incremental_sync():
+    initial = client.get("/recipes/sync")
+    assert initial.status_code == 200
+    token = initial.json()["next_token"]
+
+    recipe_data = {
+        "title": "Sync Recipe",
+        "cuisine": "Sync Cuisine",
+        "ingredients": ["sync1"],
+        "tags": "sync",
+        "steps": "cook"
+    }
+    kept, dropped = (client.post("/recipes", json=recipe_data).json()["id"] for _ in range(2))
+    client.post(f"/recipes/{kept}/favorite")
+    note_id = client.post(f"/recipes/{kept}/notes", json={"text": "sync note"}).json()["id"]
+
+    changes = client.get(f"/recipes/sync?since={token}").json()
+    assert {kept, dropped} <= {r["id"] for r in changes["recipes"]}
+    assert kept in changes["favorites"]
+    assert note_id in [n["id"] for n in changes["notes"]]
+    token = changes["next_token"]
+
+    client.delete(f"/recipes/{dropped}")
+    client.delete(f"/recipes/{kept}/favorite")
+    changes = client.get(f"/recipes/sync?since={token}").json()
+    assert dropped in changes["deleted"]["recipes"]
+    assert dropped not in [r["id"] for r in changes["recipes"]]
+    assert kept in changes["deleted"]["favorites"]
+    assert kept not in changes["favorites"]
+
+    # Favorited again after the tombstone: the current state wins.
+    client.post(f"/recipes/{kept}/favorite")
+    changes = client.get(f"/recipes/sync?since={token}").json()
+    assert kept in changes["favorites"]
+    assert kept not in changes["deleted"]["favorites"]
+
+    assert client.get("/recipes/sync?since=not-a-token").status_code == 400
+    assert client.get("/recipes/sync?since=1").status_code == 410
+
+def test_sync_pages_snapshot():
+    recipe_data = {
+        "title": "Paged Sync Recipe",
+        "cuisine": "Sync Cuisine",
+        "ingredients": ["sync1"],
+        "tags": "sync",
+        "steps": "cook"
+    }
+    created = {client.post("/recipes", json=recipe_data).json()["id"] for _ in range(5)}
+
+    synced, pages, token = [], 0, None
+    while True:
+        page = client.get("/recipes/sync", params={"limit": 2, **({"since": token} if token else {})}).json()
+        synced += [r["id"] for r in page["recipes"]]
+        assert len(page["recipes"]) <= 2
+        assert all("total_favorites" not in r for r in page["recipes"])
+        pages += 1
+        token = page["next_token"]
+        if not page["has_more"]:
+            break
+    assert pages >= 3
+    assert created <= set(synced)
+    assert len(synced) == len(set(synced))
+
+    # The token of the last page resumes like any finished sync.
+    changed = client.post("/recipes", json=recipe_data).json()["id"]
+    changes = client.get(f"/recipes/sync?since={token}").json()
+    assert changed in [r["id"] for r in changes["recipes"]]
+    assert not changes["has_more"]
+    assert client.get("/recipes/sync?since=1.2.3").status_code == 400
+
+def test_user_stats():
+    from app.crud.crud_stats import compute_user_stats
+    from app.db.session import SessionLocal
+
+    def by_cuisine(stats):
+        return {c["cuisine"]: c["count"] for c in stats["recipes_by_cuisine"]}
+
+    before = client.get("/users/me/stats")
+    assert before.status_code == 200
+    before = before.json()
+
+    recipe_data = {
+        "title": "Stats Recipe",
+        "cuisine": "Stats Cuisine",
+        "ingredients": ["Stats  Spice", "stats spice", "stats herb"],
+        "tags": "stats",
+        "steps": "count"
+    }
+    first, second = (client.post("/recipes", json=recipe_data).json()["id"] for _ in range(2))
+    client.post(f"/recipes/{first}/favorite")
+    client.post(f"/recipes/{first}/notes", json={"text": "stats note"})
+
+    # Each write invalidated the cached numbers.
+    stats = client.get("/users/me/stats").json()
+    assert stats["recipe_count"] == before["recipe_count"] + 2
+    assert by_cuisine(stats)["Stats Cuisine"] == 2
+    assert stats["favorites_received"] == before["favorites_received"] + 1
+    assert stats["notes_written"] == before["notes_written"] + 1
+
+    db = SessionLocal()
+    try:
+        fresh = compute_user_stats(db, 1, top_ingredients=1000)
+        # Normalized, and counted once per recipe.
+        assert {i["name"]: i["count"] for i in fresh["top_ingredients"]}["stats spice"] == 2
+        client.patch(f"/recipes/{second}", json={"ingredients": ["stats herb"]})
+        client.delete(f"/recipes/{first}")
+        fresh = compute_user_stats(db, 1, top_ingredients=1000)
+    finally:
+        db.close()
+    counts = {i["name"]: i["count"] for i in fresh["top_ingredients"]}
+    assert "stats spice" not in counts and counts["stats herb"] == 1
+
+    stats = client.get("/users/me/stats").json()
+    assert by_cuisine(stats)["Stats Cuisine"] == 1
+    assert stats["favorites_received"] == before["favorites_received"]
+    assert stats["notes_written"] == before["notes_written"]
+    assert stats == {**fresh, "top_ingredients": stats["top_ingredients"]}
+
+def test_stats_cache_stays_bounded():
+    from app.crud.crud_stats import StatsCache
+
+    cache = StatsCache(ttl=60, max_entries=3)
+    _, started = cache.get(1)
+    for user_id in range(1, 100):
+        cache.invalidate(user_id)
+    assert len(cache._entries) == 3
+
+    # Computed before user 1 was invalidated, whose entry is gone since.
+    cache.set(1, "stale", started)
+    assert cache.get(1)[0] is None
+    _, started = cache.get(1)
+    cache.set(1, "fresh", started)
+    assert cache.get(1)[0] == "fresh"
+    assert len(cache._entries) == 3
+
+def test_recipe_notes_pagination_query_count():
+    from sqlalchemy import event, insert
+    from app.db.session import SessionLocal, engine
+    from app.models.recipe import RecipeNote
+
+    recipe_data = {
+        "title": "Busy Notes Recipe",
+        "cuisine": "Note Cuisine",
+        "ingredients": ["note1"],
+        "tags": "notes",
+        "steps": "discuss"
+    }
+    small, large = (client.post("/recipes", json=recipe_data).json()["id"] for _ in range(2))
+    client.post(f"/recipes/{small}/notes", json={"text": "only note"})
+    db = SessionLocal()
+    try:
+        db.execute(insert(RecipeNote), [{"text": f"note {i}", "recipe_id": large, "recipe_owner_id": 1, "user_id": 1} for i in range(1000)])
+        db.commit()
+    finally:
+        db.close()
+
+    statements = []
+    def count(*args):
+        statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        def queries(url):
+            statements.clear()
+            response = client.get(url)
+            assert response.status_code == 200
+            return len(statements), response.json()
+
+        few, page = queries(f"/recipes/{small}/notes?include_author=true")
+        assert len(page) == 1 and page[0]["author"]["id"] == 1
+        many, page = queries(f"/recipes/{large}/notes?limit=200&include_author=true")
+        assert len(page) == 200 and all(note["author"]["id"] == 1 for note in page)
+        # One query for the page, one for all of its authors, whatever the note count.
+        assert many == few
+        plain, page = queries(f"/recipes/{large}/notes?limit=200")
+        assert plain == many - 1 and page[0]["author"] is None
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    # Walking every page yields each note once, in (created_at, id) order.
+    seen, after = [], None
+    while True:
+        page = client.get(f"/recipes/{large}/notes?limit=200" + (f"&after={after}" if after else "")).json()
+        if not page:
+            break
+        seen.extend(page)
+        after = page[-1]["id"]
+    assert len(seen) == len({note["id"] for note in seen}) == 1000
+    assert [(n["created_at"], n["id"]) for n in seen] == sorted((n["created_at"], n["id"]) for n in seen)
+
+    assert client.get("/recipes/999999/notes").status_code == 404
+
+def test_bulk_delete_archives_recipes():
+    from sqlalchemy import func, select
+    from app.crud import crud_recipe
+    from app.db.session import SessionLocal
+    from app.models.archive import RecipeArchive
+    from app.models.card import StaleRecipeCard
+    from app.models.recipe import Favorite, RecipeNote
+
+    recipe_data = {
+        "title": "Bulk Delete Recipe",
+        "cuisine": "Bulk Cuisine",
+        "ingredients": ["bulk1"],
+        "tags": "bulk",
+        "steps": "go"
+    }
+    ids = [client.post("/recipes", json=recipe_data).json()["id"] for _ in range(3)]
+    for recipe_id in ids:
+        client.post(f"/recipes/{recipe_id}/favorite")
+        client.post(f"/recipes/{recipe_id}/notes", json={"text": f"note on {recipe_id}"})
+
+    db = SessionLocal()
+    try:
+        # Someone else's ids are skipped.
+        assert crud_recipe.delete_recipes(db, 999999, ids) == []
+        # Batches of two: the first batch commits before the second starts.
+        assert crud_recipe.delete_recipes(db, 1, ids[:2] + [999999], batch_size=2) == ids[:2]
+    finally:
+        db.close()
+
+    response = client.delete(f"/recipes?ids={ids[2]},{ids[0]},999999")
+    assert response.status_code == 200
+    assert response.json() == {"deleted": [ids[2]], "not_found": [ids[0], 999999]}
+    assert all(client.get(f"/recipes/{recipe_id}").status_code == 404 for recipe_id in ids)
+
+    db = SessionLocal()
+    try:
+        # Children went with the recipes, and a snapshot is in the archive.
+        assert db.scalar(select(func.count()).where(Favorite.recipe_id.in_(ids))) == 0
+        assert db.scalar(select(func.count()).where(RecipeNote.recipe_id.in_(ids))) == 0
+        assert db.scalar(select(func.count()).where(StaleRecipeCard.recipe_id.in_(ids))) == 0
+        archived = {a.id: a for a in db.scalars(select(RecipeArchive).where(RecipeArchive.id.in_(ids)))}
+    finally:
+        db.close()
+    assert set(archived) == set(ids)
+    assert archived[ids[0]].recipe["title"] == "Bulk Delete Recipe"
+    assert [note["text"] for note in archived[ids[0]].notes] == [f"note on {ids[0]}"]
+    assert archived[ids[0]].favorites_count == 1
+
+    assert client.delete("/recipes?ids=a,b").status_code == 400
+    assert client.delete("/recipes?ids=" + ",".join(map(str, range(1, 502)))).status_code == 400
+
+def test_relationships_load_only_on_request():
+    from sqlalchemy.exc import InvalidRequestError
+    from app.crud import crud_recipe
+    from app.db.session import SessionLocal
+
+    recipe_data = {
+        "title": "Loader Recipe",
+        "cuisine": "Loader Cuisine",
+        "ingredients": ["loader1"],
+        "tags": "loaders",
+        "steps": "load"
+    }
+    recipe_id = client.post("/recipes", json=recipe_data).json()["id"]
+    client.post(f"/recipes/{recipe_id}/notes", json={"text": "eager"})
+    db = SessionLocal()
+    try:
+        recipe = crud_recipe.get_recipe(db, recipe_id)
+        # An accidental lazy load fails instead of quietly issuing a query.
+        with pytest.raises(InvalidRequestError):
+            recipe.owner
+        db.expunge_all()
+
+        recipe = crud_recipe.get_recipe(db, recipe_id, owner_id=1, include=["owner", "notes.user"])
+        assert recipe.owner.id == 1
+        assert [(note.text, note.user.id) for note in recipe.notes] == [("eager", 1)]
+        assert crud_recipe.get_recipe(db, recipe_id, owner_id=2) is None
+        with pytest.raises(ValueError):
+            crud_recipe.get_recipe(db, recipe_id, include=["ingredients"])
+    finally:
+        db.close()
+
+def test_recipe_cards():
+    from sqlalchemy import event
+    from app.db.session import SessionLocal, engine
+    from app.jobs.recipe_cards import STEPS_EXCERPT_LENGTH, render_pending
+
+    def render():
+        db = SessionLocal()
+        try:
+            render_pending(db)
+        finally:
+            db.close()
+
+    recipe_data = {
+        "title": "Card Recipe",
+        "cuisine": "Card Cuisine",
+        "ingredients": ["card1", "card2", "card3"],
+        "tags": "cards",
+        "steps": "stir " * 100
+    }
+    first, second = (client.post("/recipes", json=recipe_data).json()["id"] for _ in range(2))
+    client.post(f"/recipes/{first}/favorite")
+    client.post(f"/recipes/{first}/notes", json={"text": "card note"})
+    render()
+
+    statements = []
+    def count(*args):
+        statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/recipes/cards?limit=2")
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert response.status_code == 200 and len(statements) == 1
+    newer, older = response.json()
+    assert (newer["id"], older["id"]) == (second, first)
+    assert older["ingredient_count"] == 3
+    assert (older["favorite_count"], older["note_count"]) == (1, 1)
+    assert older["steps_excerpt"].endswith("stir...")
+    assert len(older["steps_excerpt"]) <= STEPS_EXCERPT_LENGTH + 3
+    assert [card["id"] for card in client.get(f"/recipes/cards?after={second}&limit=1").json()] == [first]
+
+    # Cards follow writes once the worker has run
+    client.patch(f"/recipes/{first}", json={"title": "Renamed Card"})
+    client.delete(f"/recipes/{first}/favorite")
+    render()
+    card = client.get(f"/recipes/cards?after={second}&limit=1").json()[0]
+    assert (card["title"], card["favorite_count"]) == ("Renamed Card", 0)
+    client.delete(f"/recipes/{second}")
+    assert client.get(f"/recipes/cards?limit=1").json()[0]["id"] == first
+
+def test_health_and_readiness(monkeypatch):
+    from app.api import health
+    from app.core.config import settings
+    from app.db import session
+
+    # Entering the client runs startup, which warms the pool
+    with TestClient(app) as started:
+        assert session.engine.pool.checkedin() >= min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+        assert started.get("/healthz").json() == {"status": "ok"}
+
+        response = started.get("/readyz")
+        assert response.status_code == 200
+        checks = response.json()["checks"]
+        assert checks["migrations"]["revision"] == checks["migrations"]["head"]
+        assert checks["pool"]["free"] == session.POOL_CAPACITY
+
+        monkeypatch.setattr(health, "migration_heads", lambda: frozenset({"newer"}))
+        response = started.get("/readyz")
+        assert response.status_code == 503 and not response.json()["checks"]["migrations"]["ok"]
+
+        monkeypatch.setattr(settings, "READYZ_MIN_FREE_CONNECTIONS", session.POOL_CAPACITY + 1)
+        response = started.get("/readyz")
+        # A saturated pool fails readiness without waiting for a connection
+        assert response.status_code == 503 and "database" not in response.json()["checks"]
+        assert started.get("/healthz").status_code == 200
+
+def test_owner_scoped_queries_read_one_partition():
+    import re
+    from sqlalchemy import select, text
+    from app.db.session import SessionLocal
+    from app.models.recipe import Favorite
+
+    statement = select(Favorite.recipe_id).where(Favorite.recipe_id.in_([1, 2]), Favorite.recipe_owner_id == 1)
+    db = SessionLocal()
+    try:
+        compiled = statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+        plan = "\n".join(db.scalars(text(f"EXPLAIN {compiled}")))
+        recipes_plan = "\n".join(db.scalars(text("EXPLAIN SELECT id FROM recipes WHERE owner_id = 1")))
+    finally:
+        db.close()
+    # Scan nodes name the partition they read: "... on favorites_p3 favorites"
+    assert len(set(re.findall(r" on (favorites_p\d+)", plan))) == 1
+    assert len(set(re.findall(r" on (recipes_p\d+)", recipes_plan))) == 1
+
+def test_readiness_runs_one_database_check_at_a_time(monkeypatch):
+    import asyncio
+    import time
+    from app.api import health
+
+    calls = []
+    def slow_revisions(timeout):
+        calls.append(timeout)
+        time.sleep(0.2)
+        return health.migration_heads()
+    monkeypatch.setattr(health, "database_revisions", slow_revisions)
+
+    async def probes():
+        return await asyncio.gather(*(health.readyz() for _ in range(3)))
+    responses = asyncio.run(probes())
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert len(calls) == 1
@@ -0,0 +1,73 @@
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from app.api import profiles
+from app.core.config import settings
+from app.core.profiling import ProfileStore, ProfilingMiddleware, instrument_routes
+
+ADMIN = {"X-Admin-Token": "test-admin-token"}
+
+class Total(BaseModel):
+    total: int
+
+def busy_work():
+    return sum(i * i for i in range(300_000))
+
+def make_client(sample_rate=0.0, size=5):
+    app = FastAPI()
+
+    @app.get("/work", response_model=Total)
+    def work():
+        return {"total": busy_work()}
+
+    app.include_router(profiles.router, prefix="/admin/profiles")
+    app.state.profiles = ProfileStore(size)
+    instrument_routes(app.routes, interval=0.0005)
+    app.add_middleware(
+        ProfilingMiddleware, store=app.state.profiles, sample_rate=sample_rate,
+        admin_token="test-admin-token", interval=0.0005,
+    )
+    return TestClient(app), app.state.profiles
+
+def test_only_requested_or_sampled_requests_are_profiled():
+    client, store = make_client()
+    assert client.get("/work").status_code == 200
+    assert client.get("/work", headers={"X-Profile": "1"}).status_code == 200
+    assert client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "wrong"}).status_code == 200
+    assert store.recent() == []
+
+    client.get("/work", headers={"X-Profile": "1", **ADMIN})
+    [profile] = store.recent()
+    assert (profile.method, profile.path, profile.status_code, profile.trigger) == ("GET", "/work", 200, "admin")
+
+    client, store = make_client(sample_rate=1.0)
+    client.get("/work")
+    assert [p.trigger for p in store.recent()] == ["sampled"]
+
+def test_profile_includes_threadpool_work(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "test-admin-token")
+    client, store = make_client()
+    client.get("/work", headers={"X-Profile": "1", **ADMIN})
+
+    listing = client.get("/admin/profiles/", headers=ADMIN).json()
+    assert [p["path"] for p in listing] == ["/work"]
+
+    response = client.get(f"/admin/profiles/{listing[0]['id']}?format=speedscope", headers=ADMIN)
+    assert response.status_code == 200
+    frames = {frame["name"] for frame in json.loads(response.content)["shared"]["frames"]}
+    # The sync endpoint runs in a worker thread, not on the event loop.
+    assert "busy_work" in frames
+
+    html = client.get(f"/admin/profiles/{listing[0]['id']}", headers=ADMIN)
+    assert html.headers["content-type"].startswith("text/html")
+    assert client.get("/admin/profiles/999", headers=ADMIN).status_code == 404
+    assert client.get("/admin/profiles/").status_code == 403
+
+def test_ring_buffer_keeps_newest():
+    store = ProfileStore(size=2)
+    for path in ("/a", "/b", "/c"):
+        store.add(method="GET", path=path, status_code=200, duration_ms=1.0,
+                  trigger="admin", created_at=None, session=None)
+    assert [p.path for p in store.recent()] == ["/c", "/b"]
+    assert store.get(1) is None and store.get(3).path == "/c"
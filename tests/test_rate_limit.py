@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+import fakeredis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import metrics
+from app.core.rate_limit import (
+    AdmissionControl, AdmissionControlMiddleware, ConcurrencyLimiter,
+    InMemoryBackend, RateLimitRule, RedisBackend, parse_trusted_proxies,
+)
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return InMemoryBackend()
+    return RedisBackend(fakeredis.FakeAsyncRedis())
+
+def test_token_bucket_burst_then_refill(backend):
+    async def run():
+        # 1 token per second, burst of 2.
+        results = [await backend.acquire("k", 1.0, 2, now=100.0) for _ in range(3)]
+        assert [allowed for allowed, _ in results] == [True, True, False]
+        assert results[2][1] == pytest.approx(1.0)
+        assert (await backend.acquire("k", 1.0, 2, now=100.5))[0] is False
+        assert (await backend.acquire("k", 1.0, 2, now=101.0))[0] is True
+        # Other keys have their own bucket.
+        assert (await backend.acquire("other", 1.0, 2, now=101.0))[0] is True
+    asyncio.run(run())
+
+def test_in_memory_backend_is_bounded():
+    backend = InMemoryBackend(max_keys=2)
+    async def run():
+        for key in ("a", "b", "c"):
+            await backend.acquire(key, 1.0, 1, now=0.0)
+    asyncio.run(run())
+    assert list(backend._buckets) == ["b", "c"]
+
+def test_concurrency_limiter_queues_then_sheds():
+    async def run():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1, queue_timeout=0.05)
+        assert await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        # Slot busy and queue full: rejected immediately.
+        assert await limiter.acquire() is False
+        limiter.release()
+        assert await queued is True
+        assert limiter.in_flight == 1
+        # Nobody releases this time, so the waiter times out.
+        assert await limiter.acquire() is False
+        limiter.release()
+        assert limiter.in_flight == 0
+    asyncio.run(run())
+
+def make_client(rules, limit=10, auth_limit=10, trusted_proxies="", peer="testclient"):
+    control = AdmissionControl(
+        InMemoryBackend(),
+        rules,
+        ConcurrencyLimiter("global", limit, 0, 0.01),
+        ConcurrencyLimiter("auth", auth_limit, 0, 0.01),
+        trusted_proxies=parse_trusted_proxies(trusted_proxies),
+    )
+    app = FastAPI()
+    app.state.admission = control
+    app.add_middleware(AdmissionControlMiddleware, control=control)
+    app.include_router(metrics.router)
+
+    @app.post("/auth/login")
+    def login():
+        return {"ok": True}
+
+    @app.get("/recipes")
+    def recipes():
+        return []
+
+    return TestClient(app, client=(peer, 50000))
+
+def test_middleware_limits_login_per_account():
+    rule = RateLimitRule("login_account", frozenset({"POST"}), ("/auth/login",), "account", 1, 2)
+    client = make_client([rule])
+    form = {"username": "Victim@example.com", "password": "guess"}
+    assert client.post("/auth/login", data=form).status_code == 200
+    assert client.post("/auth/login", data=form).status_code == 200
+    response = client.post("/auth/login", data={**form, "username": "victim@example.com "})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    # A different account is unaffected, and so are reads.
+    assert client.post("/auth/login", data={**form, "username": "other@example.com"}).status_code == 200
+    assert client.get("/recipes").status_code == 200
+
+    text = client.get("/metrics").text
+    assert 'decision="rejected",reason="rate_limit",rule="login_account"} 1' in text
+    assert 'decision="admitted",reason="ok",rule=""} 4' in text
+
+def test_middleware_sheds_when_saturated():
+    client = make_client([], auth_limit=0)
+    response = client.post("/auth/login", data={"username": "a", "password": "b"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/recipes").status_code == 200
+    assert 'reason="overloaded",rule="auth"} 1' in client.get("/metrics").text
+
+def test_ip_limits_use_forwarded_for_from_trusted_proxies():
+    rule = RateLimitRule("auth_ip", frozenset({"POST"}), ("/auth/login",), "ip", 1, 1)
+    form = {"username": "a", "password": "b"}
+
+    def login(client, forwarded_for):
+        return client.post("/auth/login", data=form, headers={"X-Forwarded-For": forwarded_for}).status_code
+
+    # TestClient connects from "testclient", which is not a trusted proxy:
+    # the header is ignored and both requests share one bucket.
+    client = make_client([rule])
+    assert login(client, "198.51.100.1") == 200
+    assert login(client, "198.51.100.2") == 429
+
+    # From a trusted proxy, each client gets its own bucket. A spoofed hop
+    # left of the one the proxy appended does not change it.
+    client = make_client([rule], trusted_proxies="10.0.0.0/8", peer="10.0.0.5")
+    assert login(client, "198.51.100.1") == 200
+    assert login(client, "198.51.100.2") == 200
+    assert login(client, "203.0.113.9, 198.51.100.1") == 429
+    assert login(client, "198.51.100.3, 10.0.0.7") == 200
@@ -0,0 +1,43 @@
+import numpy as np
+from app.jobs.recommendations import compute_neighbors
+
+# Favorites as (user, recipe): recipes 10 and 20 are always favorited together,
+# 30 shares one user with them, 40 is favorited alone.
+USERS = np.array([1, 1, 2, 2, 3, 3, 3, 4])
+RECIPES = np.array([10, 20, 10, 20, 10, 20, 30, 40])
+
+def collect(blocks):
+    return {
+        (int(r), int(n)): round(float(s), 6)
+        for recipe_ids, neighbor_ids, scores in blocks
+        for r, n, s in zip(recipe_ids, neighbor_ids, scores)
+    }
+
+def test_cosine_neighbors():
+    neighbors = collect(compute_neighbors(USERS, RECIPES))
+    assert neighbors[(10, 20)] == 1.0
+    assert neighbors[(30, 10)] == round(1 / np.sqrt(3), 6)
+    assert not any(40 in pair for pair in neighbors)
+    assert not any(r == n for r, n in neighbors)
+
+def test_top_k_keeps_best_neighbors():
+    neighbors = collect(compute_neighbors(USERS, RECIPES, k=1))
+    assert neighbors == {(10, 20): 1.0, (20, 10): 1.0, (30, 10): round(1 / np.sqrt(3), 6)}
+
+def test_tiny_memory_budget_gives_same_result():
+    # A zero budget forces one recipe per block.
+    assert collect(compute_neighbors(USERS, RECIPES, memory_budget_mb=0)) == collect(compute_neighbors(USERS, RECIPES))
+
+def test_duplicate_favorites_count_once():
+    users = np.append(USERS, [1, 1])
+    recipes = np.append(RECIPES, [10, 10])
+    assert collect(compute_neighbors(users, recipes)) == collect(compute_neighbors(USERS, RECIPES))
+
+def test_subset_rows_use_global_counts():
+    # Only user 3's favorites, but 10 and 20 have 3 favorites each overall.
+    neighbors = collect(compute_neighbors(
+        np.array([3, 3, 3]), np.array([10, 20, 30]),
+        rows_for=np.array([30]), item_counts=(np.array([10, 20, 30]), np.array([3, 3, 1])),
+    ))
+    assert set(neighbors) == {(30, 10), (30, 20)}
+    assert neighbors[(30, 10)] == round(1 / np.sqrt(3), 6)